@@ -24,12 +24,16 @@ GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
 # Load dynamic configuration from GCS (with caching and env fallback)
 _config_loader = None
 
+# system_config.json is fetched once and shared by every setting below (and by later
+# lookups) for this long, instead of one GCS download per get_config_value call
+_CONFIG_CACHE_TTL_SECONDS = 300
+
 def get_config_loader():
     """Get or create the global config loader instance."""
     global _config_loader
     if _config_loader is None and BUCKET_NAME:
         from services.config_loader import ConfigLoader
-        _config_loader = ConfigLoader(BUCKET_NAME)
+        _config_loader = ConfigLoader(BUCKET_NAME, cache_ttl=_CONFIG_CACHE_TTL_SECONDS)
     return _config_loader
 
 # Load configuration with GCS priority and env fallback
@@ -74,6 +78,50 @@ TOC_IMAGE_DPI = int(get_config_value(
     "100"
 ))
 
+# Upper bound (pixels) for the long edge of a rendered TOC page.
+# Gemini bills images per 768x768 tile, so capping the size bounds Vision token cost.
+TOC_IMAGE_MAX_EDGE = int(get_config_value(
+    "processing.toc_image_max_edge",
+    "TOC_IMAGE_MAX_EDGE",
+    "1536"
+))
+
+# Threads used to rasterize TOC pages in parallel. os.cpu_count() reports host CPUs on
+# Cloud Run, not the container's vCPU allotment, so the pool size is set explicitly.
+TOC_RENDER_WORKERS = max(1, int(get_config_value(
+    "processing.toc_render_workers",
+    "TOC_RENDER_WORKERS",
+    "4"
+)))
+
+# Threads for chapter/full-text page extraction on large books (each opens its own
+# Document; also capped by os.cpu_count()). Set to the instance vCPUs like TOC_RENDER_WORKERS.
+TEXT_EXTRACT_WORKERS = max(1, int(get_config_value(
+    "processing.text_extract_workers",
+    "TEXT_EXTRACT_WORKERS",
+    "4"
+)))
+
+# Encoding of rendered TOC pages sent to Gemini: "auto" (grayscale, smaller of PNG/JPEG
+# per page), "jpeg" (grayscale JPEG) or "png" (RGB PNG, the original lossless output).
+TOC_IMAGE_FORMAT = str(get_config_value(
+    "processing.toc_image_format",
+    "TOC_IMAGE_FORMAT",
+    "auto"
+)).lower()
+TOC_IMAGE_JPEG_QUALITY = int(get_config_value(
+    "processing.toc_image_jpeg_quality",
+    "TOC_IMAGE_JPEG_QUALITY",
+    "80"
+))
+
+# Consecutive TOC pages stacked vertically into one image sent to Gemini (1 = one image per page)
+TOC_PAGES_PER_IMAGE = max(1, int(get_config_value(
+    "processing.toc_pages_per_image",
+    "TOC_PAGES_PER_IMAGE",
+    "1"
+)))
+
 # TOC scan range: start page (0-indexed) and max end page
 TOC_SCAN_START_PAGE = int(get_config_value(
     "processing.toc_scan_start_page",
@@ -87,6 +135,15 @@ TOC_SCAN_END_PAGE = int(get_config_value(
     "30"
 ))
 
+# Reuse the stored book-level summary when the finalizer is re-run with an identical prompt
+# (keyed by model + prompt hash under summary_cache/ in GCS). Off by default; not in the
+# default config so the env var applies unless system_config.json sets the key.
+SUMMARY_CACHE_ENABLED = str(get_config_value(
+    "processing.summary_cache_enabled",
+    "SUMMARY_CACHE_ENABLED",
+    "false"
+)).lower() in ("1", "true", "yes")
+
 # Similarity threshold for concept matching
 SIMILARITY_THRESHOLD = float(get_config_value(
     "processing.similarity_threshold",
@@ -94,3 +151,9 @@ SIMILARITY_THRESHOLD = float(get_config_value(
     "0.82"
 ))
 
+# Minimum severity emitted by StructuredLogger (DEBUG, INFO, WARNING, ERROR)
+LOG_LEVEL = str(get_config_value(
+    "monitoring.log_level",
+    "LOG_LEVEL",
+    "INFO"
+)).upper()
@@ -17,6 +17,7 @@ import json
 import os
 import re
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 
@@ -37,13 +38,24 @@ from services.index_service import IndexService, ConceptNormalizer
 from services.analysis_service import AnalysisService
 from services.logging_service import JobLogger, get_logger, set_global_job_id
 from services.job_tracker import JobTracker
+from services.json_utils import dumps_json, loads_json
 
 # Import task handlers for routing
-from tasks.chapter_worker import process_chapter
+from tasks.chapter_worker import process_chapter, chapter_prompt_prefix
 from tasks.finalizer import finalize_book
 
 print("DEBUG: main.py - all modules imported successfully", file=sys.stderr)
 
+# Google Drive file IDs: URL-safe base64 alphabet
+_RE_DRIVE_FILE_ID = re.compile(r'^[a-zA-Z0-9_-]+$')
+
+# Prompt cache lifetime beyond the last chapter task's delay (covers Cloud Tasks retries);
+# the finalizer deletes the cache earlier when the job completes
+_PROMPT_CACHE_TTL_MARGIN_SECONDS = 3600
+
+# Concurrent uploads of the per-chapter input files (GCS round-trip bound)
+_CHAPTER_UPLOAD_WORKERS = 16
+
 
 # ... imports ...
 
@@ -89,7 +101,7 @@ def _is_valid_drive_file_id(file_id: str) -> bool:
     if file_id.startswith("test_"):
         return False
     # Google Drive IDs usually match this pattern
-    return bool(re.match(r'^[a-zA-Z0-9_-]+$', file_id))
+    return bool(_RE_DRIVE_FILE_ID.match(file_id))
 
 def _create_cloud_task(
     gcs: GcsService,
@@ -124,7 +136,7 @@ def _create_cloud_task(
         task["schedule_time"] = timestamp
     
     response = client.create_task(parent=queue_path, task=task)
-    get_logger().debug(f"Created task: {response.name}")
+    get_logger().info(f"Created task: {response.name}")
     return response.name
 
 
@@ -215,7 +227,6 @@ def prepare_book(request):
         tracker.update_status("processing", {"stage": "initialization"})
         
         pdf_processor = PdfProcessor()
-        gemini = GeminiService()
         
         creds, _ = google.auth.default(scopes=['https://www.googleapis.com/auth/drive.readonly'])
         drive_service = build('drive', 'v3', credentials=creds)
@@ -236,7 +247,20 @@ def prepare_book(request):
             file_name = file_name[:-4]
         
         logger.log_stage("download", "started", file_name=file_name)
-        pdf_path = pdf_processor.download_file_to_temp(drive_service, file_id, file_name)
+        # Download in the background while the Gemini client and master concepts are set up
+        with ThreadPoolExecutor(max_workers=1) as download_pool:
+            download_future = download_pool.submit(
+                pdf_processor.download_file_to_temp, drive_service, file_id, file_name, credentials=creds
+            )
+            try:
+                gemini = GeminiService()
+                master_concepts = list(gcs.get_concepts().get("concepts", {}).keys())
+            except Exception:
+                # Setup failed before the cleanup below is in place: don't leave the PDF in /tmp
+                if download_future.exception() is None and os.path.exists(download_future.result()):
+                    os.remove(download_future.result())
+                raise
+            pdf_path = download_future.result()
         logger.log_stage("download", "completed")
         
         try:
@@ -289,7 +313,13 @@ def prepare_book(request):
                         chapters = [{"title": "Full Text", "content": text}]
             
             # 2. Setup Job in GCS
-            master_concepts = list(gcs.get_concepts().get("concepts", {}).keys())
+            # The chapter prompt prefix is the same for every chapter: cache it once per job
+            prompt_cache = None
+            if len(chapters) > 1:
+                prompt_cache = gemini.create_prompt_cache(
+                    chapter_prompt_prefix(file_name, master_concepts[:100]),
+                    ttl_seconds=len(chapters) * 60 + _PROMPT_CACHE_TTL_MARGIN_SECONDS
+                )
             
             job_metadata = {
                 "job_id": job_id, "file_id": file_id, "book_title": file_name,
@@ -299,15 +329,22 @@ def prepare_book(request):
             }
             if len(chapters) == 1:
                 job_metadata["detection_warning"] = "only_1_chapter_detected"
+            if prompt_cache:
+                job_metadata["prompt_cache"] = prompt_cache
             
             gcs.bucket.blob(f"jobs/{job_id}/metadata.json").upload_from_string(
-                json.dumps(job_metadata, ensure_ascii=False, indent=2),
-                content_type="application/json"
-            )
-            gcs.bucket.blob(f"jobs/{job_id}/input_chapters.json").upload_from_string(
-                json.dumps(chapters, ensure_ascii=False),
+                dumps_json(job_metadata, indent=True),
                 content_type="application/json"
             )
+            # One blob per chapter so each chapter worker downloads only its own input
+            def upload_chapter(i: int):
+                gcs.bucket.blob(f"jobs/{job_id}/input_chapter_{i}.json").upload_from_string(
+                    dumps_json(chapters[i]),
+                    content_type="application/json"
+                )
+            
+            with ThreadPoolExecutor(max_workers=min(_CHAPTER_UPLOAD_WORKERS, len(chapters))) as upload_pool:
+                list(upload_pool.map(upload_chapter, range(len(chapters))))
             
             # 3. Enqueue Workers
             queue_path = f"projects/{PROJECT_ID}/locations/{REGION}/queues/{QUEUE_NAME}"
@@ -317,7 +354,8 @@ def prepare_book(request):
             for i, chapter in enumerate(chapters):
                 _create_cloud_task(gcs, queue_path, chapter_url, {
                     "job_id": job_id, "chapter_number": i,
-                    "book_title": file_name, "existing_concepts": master_concepts[:100]
+                    "book_title": file_name, "existing_concepts": master_concepts[:100],
+                    "prompt_cache": prompt_cache
                 }, delay_seconds=i * 60)
             
             _create_cloud_task(gcs, queue_path, final_url, {"job_id": job_id}, 
@@ -329,9 +367,10 @@ def prepare_book(request):
             return "OK", 200
             
         finally:
+            pdf_processor.close()
             if pdf_path and os.path.exists(pdf_path):
                 os.remove(pdf_path)
-                logger.logger.debug("Cleaned up temp PDF file")
+                logger.logger.info("Cleaned up temp PDF file")
     except Exception as e:
         if logger:
             logger.log_error("prepare_book", str(e))
@@ -379,7 +418,7 @@ def process_gcs_inbox(request):
             
             if enhanced:
                 blob.upload_from_string(enhanced.encode('utf-8'), content_type='text/markdown')
-                print(f"Processed: {blob.name}")
+                get_logger().info(f"Processed: {blob.name}")
                 
                 # Update index
                 index_service = IndexService(gcs, gemini)
@@ -434,7 +473,7 @@ def _process_clip(gemini: GeminiService, normalizer: ConceptNormalizer, content:
         return content + links, concept_names
         
     except Exception as e:
-        print(f"Error processing clip {filename}: {e}")
+        get_logger().warning(f"Error processing clip {filename}: {e}")
         return None, []
 
 
@@ -497,10 +536,10 @@ def cleanup_jobs(request):
                 continue
                 
             try:
-                metadata = json.loads(metadata_blob.download_as_text())
+                metadata = loads_json(metadata_blob.download_as_bytes())
                 status_data = None
                 if status_blob:
-                    status_data = json.loads(status_blob.download_as_text())
+                    status_data = loads_json(status_blob.download_as_bytes())
                 
                 # Determine status
                 effective_status = (status_data.get("status") if status_data and status_data.get("status") 
@@ -535,10 +574,10 @@ def cleanup_jobs(request):
                     for blob in job_blobs:
                         blob.delete()
                     deleted_count += 1
-                    print(f"Deleted job folder: {job_id} ({effective_status}, {days_since_update} days old)")
+                    get_logger().info(f"Deleted job folder: {job_id} ({effective_status}, {days_since_update} days old)")
                     
             except Exception as e:
-                print(f"Error checking job {job_id}: {e}")
+                get_logger().warning(f"Error checking job {job_id}: {e}")
                 
         return json.dumps({"status": "success", "deleted_jobs": deleted_count}), 200
         
@@ -8,6 +8,7 @@ import json
 import time
 from typing import Any, Optional
 from google.cloud import storage
+from google.cloud.exceptions import NotFound
 
 
 class ConfigLoader:
@@ -57,11 +58,11 @@ class ConfigLoader:
             bucket = client.bucket(self.bucket_name)
             blob = bucket.blob(self.config_path)
             
-            if not blob.exists():
+            try:
+                config_text = blob.download_as_text()
+            except NotFound:
                 print(f"Warning: Config file {self.config_path} not found in GCS. Using defaults.")
-                return self._get_default_config()
-            
-            config_text = blob.download_as_text()
+                return self._cache_defaults()
             config = json.loads(config_text)
             
             # Update cache
@@ -74,7 +75,14 @@ class ConfigLoader:
         except Exception as e:
             print(f"Error loading config from GCS: {e}. Using defaults/cache.")
             # Return cached config if available, otherwise defaults
-            return self._cache if self._cache else self._get_default_config()
+            return self._cache if self._cache else self._cache_defaults()
+
+    def _cache_defaults(self) -> dict:
+        """Caches the defaults like a loaded config, so a missing or unreadable file is not re-fetched per key."""
+        config = self._get_default_config()
+        self._cache = config
+        self._cache_time = time.time()
+        return config
     
     def get(self, key_path: str, default: Any = None) -> Any:
         """
@@ -118,6 +126,12 @@ class ConfigLoader:
                 "toc_scan_start_page": 3,
                 "toc_scan_end_page": 30,
                 "toc_image_dpi": 100,
+                "toc_image_max_edge": 1536,
+                "toc_image_format": "auto",
+                "toc_image_jpeg_quality": 80,
+                "toc_pages_per_image": 1,
+                "toc_render_workers": 4,
+                "text_extract_workers": 4,
                 "similarity_threshold": 0.82
             },
             "notifications": {
@@ -1,6 +1,7 @@
 import json
 from datetime import datetime
 from google.cloud import storage
+from google.cloud.exceptions import NotFound
 from config import BUCKET_NAME, OBSIDIAN_BUCKET_NAME
 
 class GcsService:
@@ -34,27 +35,28 @@ class GcsService:
     def read_obsidian_file(self, path: str) -> str:
         """Reads content from the Obsidian vault GCS bucket."""
         blob = self.obsidian_bucket.blob(path)
-        if blob.exists():
+        try:
             return blob.download_as_text()
-        return ""
+        except NotFound:
+            return ""
 
     # === Master List Management ===
     
     def get_concepts(self) -> dict:
         if self._concepts_cache is None:
             blob = self.bucket.blob("config/master_concepts.json")
-            if blob.exists():
+            try:
                 self._concepts_cache = json.loads(blob.download_as_text())
-            else:
+            except NotFound:
                 self._concepts_cache = {"concepts": {}}
         return self._concepts_cache
     
     def get_categories(self) -> dict:
         if self._categories_cache is None:
             blob = self.bucket.blob("config/master_categories.json")
-            if blob.exists():
+            try:
                 self._categories_cache = json.loads(blob.download_as_text())
-            else:
+            except NotFound:
                 self._categories_cache = self._default_categories()
         return self._categories_cache
     
@@ -77,9 +79,9 @@ class GcsService:
             return
         
         blob = self.bucket.blob("config/pending_concepts.json")
-        if blob.exists():
+        try:
             pending = json.loads(blob.download_as_text())
-        else:
+        except NotFound:
             pending = {"concepts": []}
         
         for item in self._pending_concepts_buffer:
@@ -117,9 +119,9 @@ class GcsService:
             return
         
         blob = self.bucket.blob("config/pending_categories.json")
-        if blob.exists():
+        try:
             pending = json.loads(blob.download_as_text())
-        else:
+        except NotFound:
             pending = {"categories": []}
         
         for item in self._pending_categories_buffer:
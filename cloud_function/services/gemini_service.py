@@ -1,15 +1,54 @@
 import os
+import random
 import time
 import json
 import re
 import ssl
 import sys
 import google.generativeai as genai
+from datetime import timedelta
 from typing import Optional, Dict, Any, List
 from config import GEMINI_API_KEY, get_config_value
 
 from services.logging_service import get_logger
 
+# Markdown code fence around a JSON response (compiled once, applied on every response)
+_RE_JSON_FENCE_OPEN = re.compile(r"^```json\s*")
+_RE_FENCE_OPEN = re.compile(r"^```\s*")
+_RE_FENCE_CLOSE = re.compile(r"\s*```$")
+
+# Minimum prompt size Gemini accepts for context caching (Gemini 2.5 Flash; Pro needs more,
+# where creation fails and full prompts are sent)
+_PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+def backoff_seconds(attempt: int, base: float, cap: float = 60) -> float:
+    """
+    Exponential backoff with jitter: base * 2^attempt (capped), scaled by a random
+    factor in [0.5, 1.5) so concurrent workers do not retry in lockstep.
+    Also used by scripts/toc_model_comparison_test.py.
+    """
+    return min(cap, base * 2 ** attempt) * (0.5 + random.random())
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry delay suggested by the API (google.rpc.RetryInfo in the error details), if any."""
+    for detail in getattr(error, "details", None) or []:
+        if isinstance(detail, dict):
+            # REST transport: {"@type": ".../google.rpc.RetryInfo", "retryDelay": "37s"}
+            delay = detail.get("retryDelay")
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    pass
+        else:
+            delay = getattr(detail, "retry_delay", None)
+            if delay is not None:
+                return delay.seconds + delay.nanos / 1e9
+    return None
+
+
 class GeminiService:
     def __init__(self):
         logger = get_logger()
@@ -26,7 +65,7 @@ class GeminiService:
                 "gemini-2.5-flash"
             )
             self.embedding_model = "models/text-embedding-004"
-            logger.debug(f"GeminiService initialized with model {self.model_name}")
+            logger.info(f"GeminiService initialized with model {self.model_name}")
         except Exception as e:
             logger.error(f"Failed to configure genai: {e}")
             raise
@@ -36,9 +75,13 @@ class GeminiService:
         content: Any, 
         max_retries: int = 3, 
         model_name: Optional[str] = None,
-        response_schema: Optional[Any] = None
+        response_schema: Optional[Any] = None,
+        cached_content: Optional[str] = None
     ) -> Optional[Dict]:
-        """Call Gemini with retry logic."""
+        """
+        Call Gemini with retry logic.
+        cached_content: name from create_prompt_cache; content is then only the part after the cached prefix.
+        """
         target_model_name = model_name if model_name else self.model_name
         logger = get_logger()
         
@@ -60,20 +103,36 @@ class GeminiService:
         
         logger.debug(f"Generation Config: {generation_config}")
         
-        model = genai.GenerativeModel(
-            model_name=target_model_name,
-            generation_config=generation_config,
-            safety_settings=[
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-            ]
-        )
+        safety_settings = [
+            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+        ]
+        
+        if cached_content:
+            # The model is fixed by the cache; an expired/deleted cache returns None so the
+            # caller can resend the full prompt
+            try:
+                model = genai.GenerativeModel.from_cached_content(
+                    cached_content,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings
+                )
+            except Exception as e:
+                logger.warning(f"Prompt cache {cached_content} unavailable: {e}")
+                return None
+        else:
+            model = genai.GenerativeModel(
+                model_name=target_model_name,
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
         
         for attempt in range(max_retries):
             try:
-                # The legacy SDK handles list of [text, dict_image] natively
+                # The legacy SDK handles list of [text, dict_image] natively;
+                # image parts carry raw bytes ({"mime_type", "data": bytes}), never base64 strings
                 response = model.generate_content(content)
                 
                 if not response.text:
@@ -87,9 +146,9 @@ class GeminiService:
 
                 cleaned_text = response.text.strip()
                 if cleaned_text.startswith("```"):
-                    cleaned_text = re.sub(r"^```json\s*", "", cleaned_text)
-                    cleaned_text = re.sub(r"^```\s*", "", cleaned_text)
-                    cleaned_text = re.sub(r"\s*```$", "", cleaned_text)
+                    cleaned_text = _RE_JSON_FENCE_OPEN.sub("", cleaned_text)
+                    cleaned_text = _RE_FENCE_OPEN.sub("", cleaned_text)
+                    cleaned_text = _RE_FENCE_CLOSE.sub("", cleaned_text)
                 
                 return json.loads(cleaned_text)
                 
@@ -112,16 +171,48 @@ class GeminiService:
                 error_str = str(e)
                 logger.warning(f"API error (attempt {attempt+1}): {e}")
                 
+                if attempt == max_retries - 1:
+                    continue
                 if "429" in error_str or "quota" in error_str.lower():
-                    time.sleep(60)
+                    # Chapter workers run concurrently: honor the API's delay or back off with jitter
+                    time.sleep(retry_after_seconds(e) or backoff_seconds(attempt, base=30, cap=120))
                 elif "500" in error_str or "503" in error_str:
-                    time.sleep(10)
-                elif attempt < max_retries - 1:
+                    time.sleep(backoff_seconds(attempt, base=10))
+                else:
                     time.sleep(5)
                 continue
         
         return None
 
+    def create_prompt_cache(self, prefix: str, ttl_seconds: int) -> Optional[str]:
+        """
+        Stores a prompt prefix shared by many requests in Gemini's context cache.
+        Returns the cache name, or None when caching is unavailable (e.g. the prefix
+        is below the model's minimum cacheable token count, checked before creating).
+        """
+        try:
+            prefix_tokens = genai.GenerativeModel(self.model_name).count_tokens(prefix).total_tokens
+            if prefix_tokens < _PROMPT_CACHE_MIN_TOKENS:
+                get_logger().info(f"Prompt prefix too small to cache ({prefix_tokens} tokens), sending full prompts")
+                return None
+            cache = genai.caching.CachedContent.create(
+                model=f"models/{self.model_name}",
+                contents=[prefix],
+                ttl=timedelta(seconds=ttl_seconds)
+            )
+            get_logger().info(f"Created prompt cache {cache.name} (ttl={ttl_seconds}s)")
+            return cache.name
+        except Exception as e:
+            get_logger().info(f"Prompt cache not created, sending full prompts: {e}")
+            return None
+
+    def delete_prompt_cache(self, name: str) -> None:
+        """Deletes a prompt cache before its TTL expires (best effort)."""
+        try:
+            genai.caching.CachedContent.get(name).delete()
+        except Exception as e:
+            get_logger().warning(f"Failed to delete prompt cache {name}: {e}")
+
     def get_embedding(self, text: str) -> List[float]:
         """Get text embedding."""
         result = genai.embed_content(
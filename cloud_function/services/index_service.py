@@ -2,16 +2,23 @@ import re
 import math
 import json
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 
 from config import SIMILARITY_THRESHOLD
 from .gcs_service import GcsService
 from .gemini_service import GeminiService
+from .logging_service import get_logger
+
+# Concept line in 00_Concepts_Index.md: "- [[Concept]] (3): [[Book A]], ..."
+_RE_CONCEPT_INDEX_LINE = re.compile(r'^- \[\[(.*?)\]\](?: \(\d+\))?:')
 
 class ConceptNormalizer:
     def __init__(self, gcs_service: GcsService, gemini_service: GeminiService):
         self.gcs = gcs_service
         self.gemini = gemini_service
+        # concept -> (exact/alias match, embedding match) for this instance; the finalizer
+        # normalizes the book concepts and then every chapter's, which repeat heavily
+        self._resolved: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
     
     def normalize(self, raw_concepts: List[str], book_title: str) -> List[Dict]:
         master_data = self.gcs.get_concepts()
@@ -19,7 +26,7 @@ class ConceptNormalizer:
         
         results = []
         for concept in raw_concepts:
-            normalized = self._find_match(concept, master_concepts)
+            normalized, similar = self._resolve(concept, master_concepts)
             
             if normalized:
                 results.append({
@@ -33,44 +40,53 @@ class ConceptNormalizer:
                 # Backfill embedding if missing (Self-healing)
                 if "embedding" not in target_concept:
                     try:
-                        print(f"Backfilling embedding for: {normalized}")
+                        get_logger().debug(f"Backfilling embedding for: {normalized}")
                         target_concept["embedding"] = self.gemini.get_embedding(normalized)
                     except Exception as e:
-                        print(f"Failed to backfill embedding: {e}")
+                        get_logger().warning(f"Failed to backfill embedding: {e}")
 
-            else:
-                similar = self._find_similar_by_embedding(concept, master_concepts)
+            elif similar:
+                results.append({
+                    "original": concept,
+                    "normalized": similar,
+                    "is_new": False
+                })
+                target_concept = master_concepts[similar]
+                if concept not in target_concept.get("aliases", []):
+                    target_concept.setdefault("aliases", []).append(concept)
+                target_concept["count"] = target_concept.get("count", 0) + 1
                 
-                if similar:
-                    results.append({
-                        "original": concept,
-                        "normalized": similar,
-                        "is_new": False
-                    })
-                    target_concept = master_concepts[similar]
-                    if concept not in target_concept.get("aliases", []):
-                        target_concept.setdefault("aliases", []).append(concept)
-                    target_concept["count"] = target_concept.get("count", 0) + 1
-                    
-                    # Backfill embedding if missing
-                    if "embedding" not in target_concept:
-                        try:
-                             target_concept["embedding"] = self.gemini.get_embedding(similar)
-                        except: pass
+                # Backfill embedding if missing
+                if "embedding" not in target_concept:
+                    try:
+                         target_concept["embedding"] = self.gemini.get_embedding(similar)
+                    except: pass
 
-                else:
-                    results.append({
-                        "original": concept,
-                        "normalized": concept,
-                        "is_new": True
-                    })
-                    self.gcs.add_pending_concept(concept, {"source": book_title, "category": "Unknown"})
+            else:
+                results.append({
+                    "original": concept,
+                    "normalized": concept,
+                    "is_new": True
+                })
+                self.gcs.add_pending_concept(concept, {"source": book_title, "category": "Unknown"})
         
         master_data["concepts"] = master_concepts
         self.gcs.save_concepts(master_data)
         
         return results
     
+    def _resolve(self, concept: str, master_concepts: dict) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns (exact/alias match, embedding match) for a concept, memoized so a repeated
+        concept costs neither the master list scan nor another embedding API call.
+        """
+        resolved = self._resolved.get(concept)
+        if resolved is None:
+            normalized = self._find_match(concept, master_concepts)
+            similar = None if normalized else self._find_similar_by_embedding(concept, master_concepts)
+            resolved = self._resolved[concept] = (normalized, similar)
+        return resolved
+    
     def _find_match(self, concept: str, master_concepts: dict) -> Optional[str]:
         concept_lower = concept.lower().replace(" ", "").replace("-", "")
         
@@ -92,7 +108,7 @@ class ConceptNormalizer:
         try:
             concept_embedding = self.gemini.get_embedding(concept)
         except Exception as e:
-            print(f"Embedding failed for {concept}: {e}")
+            get_logger().warning(f"Embedding failed for {concept}: {e}")
             return None
             
         best_match = None
@@ -110,7 +126,7 @@ class ConceptNormalizer:
         
         # 3. Validation against threshold
         if best_score >= SIMILARITY_THRESHOLD:
-            print(f"Similarity match: '{concept}' -> '{best_match}' (Score: {best_score:.4f})")
+            get_logger().debug(f"Similarity match: '{concept}' -> '{best_match}' (Score: {best_score:.4f})")
             return best_match
             
         return None
@@ -169,7 +185,7 @@ class IndexService:
         if entry not in content:
             content = content.rstrip() + "\n" + entry + "\n"
             self.gcs.write_to_obsidian_vault(index_path, content)
-            print(f"Updated Books Index: added {title}")
+            get_logger().info(f"Updated Books Index: added {title}")
 
     def update_concepts_index(self, concepts: List[str], book_title: str) -> None:
         """Updates the Concepts Index file in GCS."""
@@ -188,7 +204,7 @@ class IndexService:
         # Parse existing concept lines
         for idx, line in enumerate(lines):
             if line.strip().startswith('- [['):
-                match = re.match(r'^- \[\[(.*?)\]\](?: \(\d+\))?:', line)
+                match = _RE_CONCEPT_INDEX_LINE.match(line)
                 if match:
                     concept_line_map[match.group(1)] = idx
         
@@ -208,4 +224,4 @@ class IndexService:
         if updated:
             new_content = '\n'.join(lines)
             self.gcs.write_to_obsidian_vault(index_path, new_content)
-            print(f"Updated Concepts Index: added links for {book_title}")
+            get_logger().info(f"Updated Concepts Index: added links for {book_title}")
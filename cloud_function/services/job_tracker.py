@@ -5,10 +5,13 @@ This service tracks job state through the entire processing pipeline,
 making it easy to monitor progress and identify stuck or failed jobs.
 """
 from enum import Enum
-import json
 from datetime import datetime
 from typing import Optional, Dict, Any
 from google.cloud import storage
+from google.cloud.exceptions import NotFound
+
+from services.json_utils import dumps_json, loads_json
+from services.logging_service import get_logger
 
 class JobStatus(str, Enum):
     """Job status values as strings for consistency and serialization."""
@@ -49,12 +52,12 @@ class JobTracker:
         
         try:
             self.gcs.bucket.blob(self.status_path).upload_from_string(
-                json.dumps(data, ensure_ascii=False, indent=2),
+                dumps_json(data, indent=True),
                 content_type="application/json"
             )
-            print(f"Job {self.job_id} status updated: {status}")
+            get_logger().info(f"Job {self.job_id} status updated: {status}")
         except Exception as e:
-            print(f"Warning: Failed to update job status: {e}")
+            get_logger().warning(f"Failed to update job status: {e}")
     
     def mark_queued(self, total_chapters: int):
         """Mark job as queued."""
@@ -95,10 +98,9 @@ class JobTracker:
         """
         try:
             blob = self.gcs.bucket.blob(self.status_path)
-            if blob.exists():
-                content = blob.download_as_text()
-                return json.loads(content)
+            return loads_json(blob.download_as_bytes())
+        except NotFound:
             return None
         except Exception as e:
-            print(f"Warning: Failed to retrieve job status: {e}")
+            get_logger().warning(f"Failed to retrieve job status: {e}")
             return None
@@ -0,0 +1,31 @@
+"""
+JSON helpers for GCS payloads.
+
+Uses orjson (C extension, much faster on large Japanese text) when it is
+installed and falls back to the stdlib json module otherwise. Both paths
+produce UTF-8 JSON with non-ASCII characters kept as-is.
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(obj: Any, indent: bool = False) -> bytes:
+    """Serializes obj to UTF-8 JSON bytes (2-space indent when indent=True)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def loads_json(data: Union[bytes, str]) -> Any:
+    """Parses JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
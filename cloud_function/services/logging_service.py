@@ -13,20 +13,27 @@ try:
 except ImportError:
     cloud_logging = None
 
+from config import LOG_LEVEL
+
+# Numeric order of supported severities for level filtering
+_SEVERITY_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
 
 class StructuredLogger:
     """Provides structured logging for Cloud Logging integration."""
     
-    def __init__(self, job_id: Optional[str] = None, enable_console: bool = True):
+    def __init__(self, job_id: Optional[str] = None, enable_console: bool = True, min_severity: Optional[str] = None):
         """
         Initialize the structured logger.
         
         Args:
             job_id: Optional job ID to include in all log entries
             enable_console: If True, also prints to console (default: True)
+            min_severity: Entries below this severity are dropped (default: LOG_LEVEL config)
         """
         self.job_id = job_id
         self.enable_console = enable_console
+        self.min_level = _SEVERITY_LEVELS.get((min_severity or LOG_LEVEL).upper(), _SEVERITY_LEVELS["INFO"])
         
         # Initialize Cloud Logging client
         try:
@@ -37,6 +44,10 @@ class StructuredLogger:
             print(f"Warning: Cloud Logging initialization failed: {e}. Using console only.", file=sys.stderr)
             self.cloud_logging_enabled = False
     
+    def is_enabled(self, severity: str) -> bool:
+        """True if entries of this severity pass the level filter (guard costly debug formatting)."""
+        return _SEVERITY_LEVELS.get(severity, 0) >= self.min_level
+    
     def info(self, message: str, **kwargs):
         """Log info-level message."""
         self._log("INFO", message, **kwargs)
@@ -62,6 +73,10 @@ class StructuredLogger:
             message: Log message
             **kwargs: Additional structured data to include
         """
+        # Drop filtered entries before any formatting, console write or Cloud Logging RPC
+        if not self.is_enabled(severity):
+            return
+        
         # Build structured log entry
         struct = {
             "message": message,
@@ -1,60 +1,302 @@
 import re
 import os
-import json
+import unicodedata
 import pypdf
 import fitz  # PyMuPDF
-import base64
+import hashlib
+import shutil
 import sys
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud.exceptions import NotFound
 from googleapiclient.http import MediaIoBaseDownload
-from config import TOC_EXTRACTION_MODEL, TOC_IMAGE_DPI, TOC_SCAN_START_PAGE, TOC_SCAN_END_PAGE
+from config import TOC_EXTRACTION_MODEL, TOC_IMAGE_DPI, TOC_IMAGE_MAX_EDGE, TOC_IMAGE_FORMAT, TOC_IMAGE_JPEG_QUALITY, TOC_PAGES_PER_IMAGE, TOC_RENDER_WORKERS, TOC_SCAN_START_PAGE, TOC_SCAN_END_PAGE, TEXT_EXTRACT_WORKERS
 from services.logging_service import get_logger
+from services.json_utils import dumps_json, loads_json
+
+# Drive media download chunk. googleapiclient's default is 100 MB, which is buffered in
+# memory per request; 32 MB keeps round-trips few while bounding peak RAM on Cloud Run.
+_DRIVE_DOWNLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+
+# Streaming download (when credentials are given): Drive media URL and copy buffer size
+_DRIVE_MEDIA_URL = "https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+_DRIVE_STREAM_BUFFER_SIZE = 1024 * 1024
+
+# Points-to-pixels scale for TOC_IMAGE_DPI (PDF user space is 72 dpi)
+_TOC_RENDER_SCALE = TOC_IMAGE_DPI / 72
+
+# TOC pages are mostly black text, so "auto"/"jpeg" render grayscale. Scanned pages are
+# far smaller as JPEG; born-digital (vector text) pages are smaller as grayscale PNG.
+_TOC_IMAGE_COLORSPACE = fitz.csRGB if TOC_IMAGE_FORMAT == "png" else fitz.csGRAY
+
+# GCS prefix for Vision TOC results keyed by PDF content hash
+_TOC_CACHE_PREFIX = "toc_cache"
+
+# Chapter heading patterns for split_into_chapters
+# strict: headings at line start (第1部, 第一章, Chapter 1, Part I, ...) plus the title text after them.
+#   Positive Lookahead (?=[\s　\n\r:：\.．]) REQUIRES a separator after 部/章, which excludes
+#   "第三部隊" (followed by 隊), "第一部は" (followed by は), etc.
+# loose: 第X部 or 第X章 anywhere; only used when strict detection finds 0-1 headings.
+_CHAPTER_STRICT_PATTERN = r'(?:^|[\n\r]+)\s*(?:第\s*([0-9０-９一二三四五六七八九十百壱弐参]+)\s*[部章編節](?=[\s　\n\r:：\.．])|(?:Chapter|CHAPTER|Part|PART|パート)\s*([0-9０-９IVXivx]+))[　\s:：\-−—.．]*([^\n\r]{0,80})'
+_CHAPTER_LOOSE_PATTERN = r'第\s*[0-9０-９一二三四五六七八九十壱弐参]+\s*[部章](?=[\s　\n\r:：\.．])'
+# Both families in one alternation so the text is scanned once; m.lastgroup tells them apart
+_RE_CHAPTER_ANY = re.compile(
+    f'(?P<strict>{_CHAPTER_STRICT_PATTERN})|(?P<loose>{_CHAPTER_LOOSE_PATTERN})',
+    re.IGNORECASE
+)
+_RE_CHAPTER_LOOSE = re.compile(_CHAPTER_LOOSE_PATTERN)
+# Every heading contains one of these keywords (第 / パート / Chapter / Part). The leading
+# character class lets the regex engine skip ahead cheaply; the lookbehinds confirm the keyword.
+_RE_CHAPTER_KEYWORD = re.compile(
+    r'[第パCcPp](?:(?<=第)|(?<=パ)ート|(?<=[Cc])hapter|(?<=[Pp])art)',
+    re.IGNORECASE
+)
+
+# OCR-noise patterns for clean_extracted_text
+_NOISE_REPEAT_CLASS = r'[：:；;！!．.…‐\-ｉｌI]'
+_NOISE_SEPARATOR_CLASS = r'[：:；;！!．.\s]'
+# One pass for both noise rules; m.lastgroup picks the replacement.
+#   rep:   sequences of 3+ repeated punctuation/symbols (:::, !!!, ..., ;;;, ：：：, など) -> ' '
+#   stray: isolated single I/i/l surrounded by spaces or punctuation (OCR artifacts) -> ''
+# The stray lookarounds also accept an adjacent 3+ symbol run, because that run becomes
+# ' ' and the original two-pass cleaner saw the space there.
+_RE_OCR_NOISE = re.compile(
+    f'(?P<rep>{_NOISE_REPEAT_CLASS}{{3,}})'
+    f'|(?P<stray>(?:(?<={_NOISE_SEPARATOR_CLASS})|(?<={_NOISE_REPEAT_CLASS}{{3}}))'
+    f'[IiｉｌＩ]'
+    f'(?={_NOISE_SEPARATOR_CLASS}|{_NOISE_REPEAT_CLASS}{{3}}))'
+)
+_OCR_NOISE_REPLACEMENTS = {"rep": " ", "stray": ""}
+# Whitespace normalization in one pass: runs of spaces/tabs -> ' ', 3+ newlines -> blank line.
+# A lone ' ' is already normalized, so only runs of 2+ or a lone tab match; this keeps the
+# Python-level replacement callback off every word gap.
+_RE_WHITESPACE_RUNS = re.compile(r'(?P<ws>[ \t]{2,}|\t)|(?P<nl>\n{3,})')
+_WHITESPACE_REPLACEMENTS = {"ws": " ", "nl": "\n\n"}
+
+# Any character that can take part in an OCR-noise match in clean_extracted_text.
+# When none is present, the two noise passes cannot match and are skipped.
+_RE_NOISE_CHAR = re.compile(r'[：:；;！!．.…‐\-ｉｌIiＩ]')
+
+# Leading whitespace run for _stripped_slice (\s matches exactly str.isspace())
+_RE_LEADING_WS = re.compile(r'\s*')
+
+# Strips everything but digits from page numbers like "p.15"
+_RE_NON_DIGIT = re.compile(r'\D')
+
+# Chapter number normalization (_normalize_chapter_number)
+# OCR marks deleted after NFKC, as a str.translate table (one C pass, no regex)
+_TITLE_OCR_MARKS_TABLE = str.maketrans('', '', '〃″′"｜')
+_RE_JA_CHAPTER_NUMBER = re.compile(r'第\s*(\d+)\s*[章部編節]')
+_RE_EN_CHAPTER_NUMBER = re.compile(r'(?:Chapter|Part|PART|パート)\s*(\d+)', re.IGNORECASE)
+
+# 章タイトルのゴミパターン (_clean_chapter_title)
+_TITLE_NOISE_SUBSTITUTIONS = [
+    (re.compile(r'Contents$'), ''),           # 末尾の "Contents"
+    (re.compile(r'目次$'), ''),               # 末尾の "目次"
+    (re.compile(r'\d{3,}第'), ' 第'),         # ページ番号+「第」
+    (re.compile(r'[\'\"''""`|]'), ''),        # 引用符・パイプ
+    (re.compile(r'^\s*[：:]+\s*'), ''),       # 先頭コロン
+    (re.compile(r'\s{2,}'), ' '),             # 連続空白
+    (re.compile(r'[■□◆◇●○]+'), ''),         # OCR記号ノイズ
+]
+
+# TOC quality / continuity checks
+# ゴミ文字（Contents, 目次, 3桁以上の数字+第, OCRノイズ）
+_RE_TOC_GARBAGE = re.compile(r'Contents|目次|\d{3,}第|[■□◆◇●○]{3,}')
+_RE_TOC_CHAPTER_NUMBER = re.compile(r'第(\d+)章')
+
+# Text-layer TOC detection before rendering (_find_text_toc_range): a line ending in a
+# 1-3 digit page number ("第1章 はじめに …… 15", or a bare "15" split onto its own line).
+# Years (4 digits) are excluded so body text with dates does not qualify.
+_RE_TOC_ENTRY_LINE = re.compile(r'(?:^|[\s.…‥・\-－])\d{1,3}[ \t]*$', re.MULTILINE)
+_TOC_PAGE_MIN_ENTRY_LINES = 5
+
+# PDF outline (bookmarks) used instead of Vision when it has at least this many entries
+_OUTLINE_MIN_ENTRIES = 3
+# Level-1 outline entries that are parts rather than chapters (第1部, Part I, パート1)
+_RE_OUTLINE_PART = re.compile(r'^\s*(?:第\s*\S{1,4}?\s*部|Part\b|パート)', re.IGNORECASE)
+# Outline entries that are not content (cover, TOC page, colophon)
+_RE_OUTLINE_SKIP = re.compile(r'^\s*(?:表紙|目次|奥付|Cover|Contents|Table of Contents|Copyright)\s*$', re.IGNORECASE)
+
+# PyMuPDF flags for page.get_text("text"): the plain-text defaults plus dehyphenation,
+# without TEXT_PRESERVE_IMAGES so image blocks never reach the extracted text.
+# TEXT_INHIBIT_SPACES is deliberately not set: PDFs that position words without
+# space glyphs (common for Latin text) would otherwise have words run together.
+_PAGE_TEXT_FLAGS = (fitz.TEXTFLAGS_TEXT | fitz.TEXT_DEHYPHENATE) & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Below this many pages, text extraction stays on the shared handle (re-opening the PDF per worker would dominate)
+_PARALLEL_EXTRACT_MIN_PAGES = 64
+
+# Separator for cleaning many texts in one pass. U+FFFF is a Unicode noncharacter:
+# never present in extracted text, not whitespace, and matched by no cleaning pattern.
+_CLEAN_BATCH_SEPARATOR = "\uffff"
+
+def _extract_page_texts(pdf_path: str, page_indices: List[int], doc: Optional["fitz.Document"] = None) -> List[str]:
+    """
+    Raw text of the given pages, "" for pages that fail. Without doc (worker threads),
+    it opens its own Document since handles must not be shared across threads.
+    """
+    if doc is None:
+        with fitz.open(pdf_path) as own_doc:
+            return _extract_page_texts(pdf_path, page_indices, own_doc)
+    
+    texts = []
+    for i in page_indices:
+        try:
+            texts.append(doc[i].get_text("text", flags=_PAGE_TEXT_FLAGS))
+        except Exception as e:
+            get_logger().warning(f"Error extracting page {i+1}: {e}")
+            texts.append("")
+    return texts
+
 
 class PdfProcessor:
-    def download_file_to_temp(self, drive_service, file_id: str, file_name: str) -> str:
-        """Downloads file content from Google Drive to a temporary file."""
+    def __init__(self):
+        # Shared fitz.Document for the PDF currently being processed (see _get_document)
+        self._doc = None
+        self._doc_path = None
+        # Guards the shared handle; re-entrant because _get_document calls close()
+        self._doc_lock = threading.RLock()
+        # page index -> cleaned text of that page in self._doc (see _clean_page_texts)
+        self._clean_pages: Dict[int, str] = {}
+        # job_id -> contents of jobs/{job_id}/errors.json written by this processor
+        self._error_buffer: Dict[str, Dict[str, Any]] = {}
+
+    def _get_document(self, pdf_path: str) -> "fitz.Document":
+        """
+        Returns a fitz.Document for pdf_path, opened once and shared by TOC and
+        chapter extraction so the xref/page tree is parsed a single time per job.
+        """
+        with self._doc_lock:
+            if self._doc is None or self._doc_path != pdf_path:
+                self.close()
+                self._doc = fitz.open(pdf_path)
+                self._doc_path = pdf_path
+            return self._doc
+
+    def close(self):
+        """Closes the shared fitz.Document, if any. Call before deleting the PDF file."""
+        with self._doc_lock:
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+                self._doc_path = None
+            self._clean_pages = {}
+
+    def download_file_to_temp(self, drive_service, file_id: str, file_name: str, credentials=None) -> str:
+        """
+        Downloads file content from Google Drive to a temporary file.
+        With credentials, the media is streamed straight to disk in 1 MB pieces;
+        otherwise it falls back to chunked MediaIoBaseDownload.
+        """
         logger = get_logger()
         logger.info(f"Starting download for {file_name} ({file_id})")
-        request = drive_service.files().get_media(fileId=file_id)
         
         # Use a temp file path - simpler than NamedTemporaryFile for windows/unix compat in cloud run
         temp_path = f"/tmp/{file_id}.pdf"
+        # Written under .part and renamed when complete, so a reader never sees a truncated PDF
+        part_path = temp_path + ".part"
         
-        with open(temp_path, "wb") as fh:
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-                if status:
-                    logger.debug(f"Download progress: {int(status.progress() * 100)}%")
+        try:
+            with open(part_path, "wb") as fh:
+                if credentials is not None:
+                    self._stream_drive_media(credentials, file_id, fh)
+                else:
+                    request = drive_service.files().get_media(fileId=file_id)
+                    downloader = MediaIoBaseDownload(fh, request, chunksize=_DRIVE_DOWNLOAD_CHUNK_SIZE)
+                    done = False
+                    while done is False:
+                        status, done = downloader.next_chunk()
+                        if status:
+                            logger.debug(f"Download progress: {int(status.progress() * 100)}%")
+            os.replace(part_path, temp_path)
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
                     
         logger.info(f"Download complete: {temp_path}")
         return temp_path
 
+    def _stream_drive_media(self, credentials, file_id: str, fh) -> None:
+        """Copies the Drive media response body to fh without buffering whole chunks in memory."""
+        logger = get_logger()
+        session = AuthorizedSession(credentials)
+        try:
+            url = _DRIVE_MEDIA_URL.format(file_id=file_id)
+            with session.get(url, stream=True) as resp:
+                resp.raise_for_status()
+                total = resp.headers.get("Content-Length")
+                logger.debug(f"Download size: {total or 'unknown'} bytes")
+                # Let urllib3 undo any Content-Encoding while copying raw
+                resp.raw.decode_content = True
+                shutil.copyfileobj(resp.raw, fh, length=_DRIVE_STREAM_BUFFER_SIZE)
+        finally:
+            session.close()
+
     def extract_text_from_pdf_file(self, pdf_path: str) -> str:
-        """Extracts text from PDF file path using pypdf (Pure Python)."""
+        """Extracts text from PDF file path using PyMuPDF, falling back to pypdf."""
         logger = get_logger()
         logger.info(f"Extracting text from: {pdf_path}")
-        reader = pypdf.PdfReader(pdf_path)
-        text_parts = []
-        
-        # pypdf might be slower but safer from segfaults
-        for i, page in enumerate(reader.pages):
-            try:
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
-            except Exception as e:
-                logger.warning(f"Failed to extract text from page {i}: {e}")
+        try:
+            doc = self._get_document(pdf_path)
+            clean_pages = self._clean_page_texts(pdf_path, range(len(doc)))
+            text_parts = [clean_pages[i] for i in range(len(doc))]
+        except Exception as e:
+            logger.warning(f"PyMuPDF extraction failed, falling back to pypdf: {e}")
+            # Clean OCR noise
+            text_parts = self._clean_extracted_texts(self._extract_pages_with_pypdf(pdf_path))
                 
-        full_text = "".join(text_parts)
-        
-        # Clean OCR noise
-        full_text = self.clean_extracted_text(full_text)
+        full_text = "\n".join(part for part in text_parts if part)
         
         logger.info(f"Text extraction complete. Length: {len(full_text)} chars")
         return full_text
 
+    def _clean_page_texts(self, pdf_path: str, page_indices: Iterable[int]) -> Dict[int, str]:
+        """
+        Returns {page index: cleaned text} for the shared Document. Each page is
+        extracted and cleaned at most once per document, so chapter extraction,
+        its retry and the full-text fallback reuse the same work.
+        """
+        logger = get_logger()
+        doc = self._get_document(pdf_path)
+        missing = [i for i in page_indices if i not in self._clean_pages]
+        if missing:
+            # Never more threads than visible CPUs: MuPDF releases the GIL while extracting
+            workers = min(TEXT_EXTRACT_WORKERS, os.cpu_count() or 1, len(missing) // _PARALLEL_EXTRACT_MIN_PAGES)
+            if workers > 1:
+                # Contiguous slices keep each worker's page-tree access local
+                chunk_size = -(-len(missing) // workers)  # ceil division
+                chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+                try:
+                    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+                        raw_texts = [t for texts in executor.map(_extract_page_texts, [pdf_path] * len(chunks), chunks) for t in texts]
+                except Exception as e:
+                    logger.warning(f"Parallel page extraction failed, extracting serially: {e}")
+                    raw_texts = _extract_page_texts(pdf_path, missing, doc)
+            else:
+                raw_texts = _extract_page_texts(pdf_path, missing, doc)
+            self._clean_pages.update(zip(missing, self._clean_extracted_texts(raw_texts)))
+        return self._clean_pages
+
+    def _extract_pages_with_pypdf(self, pdf_path: str) -> List[str]:
+        """Pure-Python page text extraction, used when MuPDF cannot parse the file."""
+        logger = get_logger()
+        # strict=False: tolerate malformed objects instead of raising per page
+        reader = pypdf.PdfReader(pdf_path, strict=False)
+        # Bind the page list once; reader.pages builds a fresh _VirtualList on every access
+        pages = reader.pages
+        text_parts = [""] * len(pages)
+        
+        for i, page in enumerate(pages):
+            try:
+                text_parts[i] = page.extract_text() or ""
+            except Exception as e:
+                logger.warning(f"Failed to extract text from page {i}: {e}")
+        return text_parts
+
     def clean_extracted_text(self, text: str) -> str:
         """
         Removes OCR noise from extracted PDF text.
@@ -62,45 +304,67 @@ class PdfProcessor:
         - Stray I/i/l characters that are OCR artifacts
         - Extra whitespace
         """
-        # Remove sequences of 3+ repeated punctuation/symbols
-        # Matches patterns like :::, !!!, ..., ;;;, ：：：, など
-        text = re.sub(r'[：:；;！!．.…‐\-ｉｌI]{3,}', ' ', text)
-        
-        # Remove isolated single I/i/l surrounded by spaces or punctuation (OCR artifacts)
-        text = re.sub(r'(?<=[：:；;！!．.\s])[IiｉｌＩ](?=[：:；;！!．.\s])', '', text)
+        if _RE_NOISE_CHAR.search(text):
+            # Remove repeated symbols and stray I/i/l in a single scan
+            text = _RE_OCR_NOISE.sub(lambda m: _OCR_NOISE_REPLACEMENTS[m.lastgroup], text)
         
         # Collapse multiple spaces/newlines into single space
-        text = re.sub(r'[ \t]+', ' ', text)
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = _RE_WHITESPACE_RUNS.sub(lambda m: _WHITESPACE_REPLACEMENTS[m.lastgroup], text)
         
         return text.strip()
 
+    def _clean_extracted_texts(self, texts: List[str]) -> List[str]:
+        """
+        Batch form of clean_extracted_text: joins texts with a sentinel, cleans once,
+        then splits back. Same output as cleaning each text on its own.
+        """
+        if len(texts) <= 1:
+            return [self.clean_extracted_text(t) for t in texts]
+        
+        joined = _CLEAN_BATCH_SEPARATOR.join(texts)
+        if joined.count(_CLEAN_BATCH_SEPARATOR) != len(texts) - 1:
+            # Sentinel already present in the input; splitting back would be ambiguous
+            return [self.clean_extracted_text(t) for t in texts]
+        
+        return [t.strip() for t in self.clean_extracted_text(joined).split(_CLEAN_BATCH_SEPARATOR)]
+
     def split_into_chapters(self, text: str) -> List[Dict[str, str]]:
         """
         Splits text into chapters/parts with improved pattern matching.
         Handles multiple formats: Chapter X, 第X章, Part X, PART X, 第X部, パートX, etc.
         Includes fallback logic when initial detection fails.
         """
-        # Primary pattern - strict matching with separators
-        # Matches: 第1部, 第一章, Chapter 1, Part I, etc.
-        # Changed to Positive Lookahead (?=[\s　\n\r:：\.．]) to REQUIRE a separator after the logic type.
-        # This excludes "第三部隊" (followed by 隊), "第一部は" (followed by は), etc.
-        primary_pattern = r'(?:^|[\n\r]+)\s*(?:第\s*([0-9０-９一二三四五六七八九十百壱弐参]+)\s*[部章編節](?=[\s　\n\r:：\.．])|(?:Chapter|CHAPTER|Part|PART|パート)\s*([0-9０-９IVXivx]+))[　\s:：\-−—.．]*([^\n\r]{0,80})'
+        # Single pass over the text collects both strict (primary) and loose (fallback) headings
+        matches = []
+        loose_matches = []
+        for m in self._iter_chapter_headings(text):
+            if m.lastgroup == "strict":
+                matches.append(m)
+            else:
+                loose_matches.append(m)
         
-        matches = list(re.finditer(primary_pattern, text, re.IGNORECASE))
         logger = get_logger()
-        logger.debug(f"Chapter detection (primary): Found {len(matches)} chapters/parts")
-        for m in matches[:10]:  # Log first 10 matches
-            logger.debug(f"  - Detected: {m.group(0).strip()[:60]}...")
+        # Per-match debug strings are only built when DEBUG logging is on
+        debug_enabled = logger.is_enabled("DEBUG")
+        logger.info(f"Chapter detection (primary): Found {len(matches)} chapters/parts")
+        if debug_enabled:
+            for m in matches[:10]:  # Log first 10 matches
+                logger.debug(f"  - Detected: {m.group(0).strip()[:60]}...")
         
         # Fallback: If only 0-1 chapters detected, try more lenient pattern
         if len(matches) <= 1:
             logger.warning("Only 0-1 chapters detected. Trying fallback pattern...")
             # More lenient pattern - just looks for 第X部 or 第X章 anywhere
-            # Added Positive Lookahead here too
-            fallback_pattern = r'第\s*[0-9０-９一二三四五六七八九十壱弐参]+\s*[部章](?=[\s　\n\r:：\.．])'
-            fallback_positions = [(m.start(), m.group()) for m in re.finditer(fallback_pattern, text)]
-            logger.debug(f"  Fallback pattern found {len(fallback_positions)} matches")
+            if matches:
+                # Loose headings inside the single strict match were consumed by it; recover them
+                strict_match = matches[0]
+                for m in _RE_CHAPTER_LOOSE.finditer(text, strict_match.start()):
+                    if m.start() >= strict_match.end():
+                        break
+                    loose_matches.append(m)
+                loose_matches.sort(key=lambda m: m.start())
+            fallback_positions = [(m.start(), m.group()) for m in loose_matches]
+            logger.info(f"  Fallback pattern found {len(fallback_positions)} matches")
             
             if len(fallback_positions) > len(matches):
                 # Use fallback matches to split the text
@@ -108,14 +372,15 @@ class PdfProcessor:
                 for i, (pos, title) in enumerate(fallback_positions):
                     start = pos + len(title)
                     end = fallback_positions[i+1][0] if i + 1 < len(fallback_positions) else len(text)
-                    content = text[start:end].strip()
+                    content = self._stripped_slice(text, start, end)
                     # Get a better title by looking ahead a bit
                     title_extended = self._clean_chapter_title(
                         text[pos:min(pos+100, len(text))].split('\n')[0].strip()
                     )
                     if content:
                         chapters.append({"title": title_extended, "content": content})
-                        logger.debug(f"  [Fallback] Chapter '{title_extended[:40]}...' has {len(content)} chars")
+                        if debug_enabled:
+                            logger.debug(f"  [Fallback] Chapter '{title_extended[:40]}...' has {len(content)} chars")
                 
                 if chapters:
                     return chapters
@@ -131,61 +396,113 @@ class PdfProcessor:
             start = matches[i].end()
             end = matches[i+1].start() if i + 1 < len(matches) else len(text)
             title = self._clean_chapter_title(matches[i].group(0).strip())
-            content = text[start:end].strip()
+            content = self._stripped_slice(text, start, end)
             if content:
                 chapters.append({"title": title, "content": content})
-                logger.debug(f"  Chapter '{title[:40]}...' has {len(content)} chars")
+                if debug_enabled:
+                    logger.debug(f"  Chapter '{title[:40]}...' has {len(content)} chars")
         
         # Runaway detection and deduplication
         if len(chapters) > 30:
             logger.warning(f"Potentially too many chapters detected: {len(chapters)}")
-            unique_ch_nums = set(self._normalize_chapter_number(ch['title']) for ch in chapters)
-            unique_ch_nums.discard(None)
+            # Normalize once; the same numbers are reused by _deduplicate_chapters
+            norms = [self._normalize_chapter_number(ch['title']) for ch in chapters]
+            unique_ch_nums = {n for n in norms if n}
             
             duplication_rate = 1 - (len(unique_ch_nums) / len(chapters)) if chapters else 0
-            logger.debug(f"Unique chapter numbers: {len(unique_ch_nums)}, Duplication rate: {duplication_rate:.2%}")
+            logger.info(f"Unique chapter numbers: {len(unique_ch_nums)}, Duplication rate: {duplication_rate:.2%}")
             
             if duplication_rate > 0.5:
                 logger.warning(f"High duplication detected ({duplication_rate:.2%}). Applying deduplication...")
-                chapters = self._deduplicate_chapters(chapters)
+                chapters = self._deduplicate_chapters(chapters, norms)
                 logger.info(f"After deduplication: {len(chapters)} chapters")
                 
         return chapters
     
+    def _iter_chapter_headings(self, text: str) -> Iterator[re.Match]:
+        """
+        Same matches as _RE_CHAPTER_ANY.finditer(text), but the full pattern is only
+        tried next to keyword hits instead of at every character of the book.
+        A strict heading may start at the first newline of the whitespace run before
+        its keyword (or at 0); a loose heading starts at the keyword itself.
+        """
+        pos = 0
+        for keyword in _RE_CHAPTER_KEYWORD.finditer(text):
+            kw_start = keyword.start()
+            if kw_start < pos:
+                continue
+            
+            ws_start = kw_start
+            while ws_start > pos and text[ws_start - 1].isspace():
+                ws_start -= 1
+            
+            candidates = []
+            if ws_start == 0:
+                candidates.append(0)
+            else:
+                for i in range(ws_start, kw_start):
+                    if text[i] in '\n\r':
+                        candidates.append(i)
+                        break
+            candidates.append(kw_start)
+            
+            for start in candidates:
+                m = _RE_CHAPTER_ANY.match(text, start)
+                if m:
+                    yield m
+                    pos = m.end()
+                    break
+
+    def _stripped_slice(self, text: str, start: int, end: int) -> str:
+        """
+        Equivalent to text[start:end].strip(), but trims by offset first so the
+        (possibly MB-sized) chapter body is copied once instead of twice.
+        """
+        start = _RE_LEADING_WS.match(text, start, end).end()
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return text[start:end]
+    
     def _normalize_chapter_number(self, title: str) -> Optional[str]:
         """
         章番号部分のみを正規化して抽出。
         OCRノイズ（〃、″など）を除去し、全角→半角変換。
         """
-        import unicodedata
-        
-        # 全角→半角、OCRノイズ除去
-        title = unicodedata.normalize('NFKC', title)
-        title = re.sub(r'[〃″′"｜]', '', title)
+        # 全角→半角、OCRノイズ除去（ASCIIのみのタイトルはNFKCで変化しないため省略）
+        if not title.isascii():
+            title = unicodedata.normalize('NFKC', title)
+        title = title.translate(_TITLE_OCR_MARKS_TABLE)
         
         # 第X章、第X部などを抽出
-        m = re.search(r'第\s*(\d+)\s*[章部編節]', title)
+        m = _RE_JA_CHAPTER_NUMBER.search(title)
         if m:
             return f"第{m.group(1)}章"
         
         # Chapter X, Part X などを抽出
-        m = re.search(r'(?:Chapter|Part|PART|パート)\s*(\d+)', title, re.IGNORECASE)
+        m = _RE_EN_CHAPTER_NUMBER.search(title)
         if m:
             return f"Chapter{m.group(1)}"
             
         return None
     
-    def _deduplicate_chapters(self, chapters: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    def _deduplicate_chapters(
+        self,
+        chapters: List[Dict[str, str]],
+        norms: Optional[List[Optional[str]]] = None
+    ) -> List[Dict[str, str]]:
         """
         同一章の重複を除去し、最も長いコンテンツを採用。
         章番号（第X章）のみで判定し、OCRノイズを無視。
+        norms: 各章の _normalize_chapter_number 結果（計算済みなら再利用）
         """
         logger = get_logger()
         seen = {}  # chapter_number -> (index, content_length, chapter_dict)
         result = []
         
-        for ch in chapters:
-            ch_num = self._normalize_chapter_number(ch['title'])
+        if norms is None:
+            norms = [self._normalize_chapter_number(ch['title']) for ch in chapters]
+        
+        for ch, ch_num in zip(chapters, norms):
             if ch_num:
                 if ch_num in seen:
                     # 既存より長いコンテンツなら置換
@@ -205,25 +522,12 @@ class PdfProcessor:
     
     def _clean_chapter_title(self, title: str) -> str:
         """章タイトルからOCRノイズを除去"""
-        import unicodedata
-        import re
-        
         # 全角→半角正規化
         title = unicodedata.normalize('NFKC', title)
         
         # ゴミパターン除去
-        patterns = [
-            (r'Contents$', ''),           # 末尾の "Contents"
-            (r'目次$', ''),               # 末尾の "目次"
-            (r'\d{3,}第', ' 第'),         # ページ番号+「第」
-            (r'[\'\"''""`|]', ''),        # 引用符・パイプ
-            (r'^\s*[：:]+\s*', ''),       # 先頭コロン
-            (r'\s{2,}', ' '),             # 連続空白
-            (r'[■□◆◇●○]+', ''),         # OCR記号ノイズ
-        ]
-        
-        for pattern, replacement in patterns:
-            title = re.sub(pattern, replacement, title)
+        for pattern, replacement in _TITLE_NOISE_SUBSTITUTIONS:
+            title = pattern.sub(replacement, title)
         
         # 長すぎるタイトルを切り詰め（80文字まで）
         if len(title) > 80:
@@ -254,33 +558,58 @@ class PdfProcessor:
         scan_end = override_end_page if override_end_page else TOC_SCAN_END_PAGE
         logger = get_logger()
         logger.info("Starting Vision-based TOC extraction...")
-        logger.info(f"  Config: Model={TOC_EXTRACTION_MODEL}, DPI={TOC_IMAGE_DPI}, Pages={TOC_SCAN_START_PAGE+1}-{scan_end}")
+        logger.info(f"  Config: Model={TOC_EXTRACTION_MODEL}, DPI={TOC_IMAGE_DPI}, MaxEdge={TOC_IMAGE_MAX_EDGE}px, Format={TOC_IMAGE_FORMAT}, Pages={TOC_SCAN_START_PAGE+1}-{scan_end}")
         
         error_details = None
         
+        # Well-authored PDFs carry their own outline: no rendering, no Gemini call
+        if override_end_page is None and not is_retry:
+            outline_result = self._toc_from_outline(pdf_path)
+            if outline_result:
+                chapters = outline_result["chapters_in_this_volume"]
+                logger.info(f"Using PDF outline as TOC: {len(chapters)} chapters (Vision skipped)")
+                self._save_toc_error(gcs_service, job_id, {
+                    "stage": "pdf_outline",
+                    "extracted_chapters_count": len(chapters),
+                    "raw_result": outline_result
+                })
+                return outline_result
+        
+        cache_key = self._toc_cache_key(pdf_path, scan_end) if gcs_service else None
+        cached = self._load_toc_cache(gcs_service, cache_key)
+        if cached:
+            logger.info(f"Vision TOC cache hit: {cache_key}")
+            return cached
+        
         try:
-            doc = fitz.open(pdf_path)
-            total_pages = len(doc)
+            total_pages = len(self._get_document(pdf_path))
             filename = os.path.basename(pdf_path)
             
             # Use configurable scan range
             start_page = TOC_SCAN_START_PAGE
             end_page = min(scan_end, total_pages)
             
-            images = []
-            logger.info(f"Converting pages {start_page+1}-{end_page} to images (DPI={TOC_IMAGE_DPI})...")
+            # Only send the pages whose text layer already looks like a TOC; retries and
+            # scans without a text layer keep the full range
+            page_range_note = ""
+            text_toc_range = None
+            if override_end_page is None and not is_retry:
+                text_toc_range = self._find_text_toc_range(pdf_path, start_page, end_page)
+                if text_toc_range:
+                    start_page, end_page = text_toc_range
+                    page_range_note = f"\n- 添付画像: {start_page+1}〜{end_page}ページ目（テキスト層から目次と判定したページ）"
+                    logger.info(f"Text layer TOC candidate pages: {start_page+1}-{end_page}")
             
-            for i in range(start_page, end_page):
-                page = doc[i]
-                pix = page.get_pixmap(dpi=TOC_IMAGE_DPI)
-                img_bytes = pix.tobytes("png")
-                
-                images.append({
-                    "mime_type": "image/png",
-                    "data": base64.b64encode(img_bytes).decode("utf-8")
-                })
+            logger.info(f"Converting pages {start_page+1}-{end_page} to images (DPI={TOC_IMAGE_DPI})...")
+            # Raw bytes: the SDK stores them as-is in the inline Blob (a base64 str would be decoded back)
+            images = [
+                {"mime_type": mime_type, "data": img_bytes}
+                for mime_type, img_bytes in self._render_toc_pages(pdf_path, start_page, end_page)
+            ]
             
-            doc.close()
+            image_layout_note = ""
+            if TOC_PAGES_PER_IMAGE > 1:
+                image_layout_note = f"\n- 各画像は連続する最大{TOC_PAGES_PER_IMAGE}ページを上から順に縦に結合したものです"
             
             prompt = f"""あなたは日本語書籍の目次（Table of Contents）を解析する専門家です。
 
@@ -290,7 +619,7 @@ class PdfProcessor:
 【PDF情報】
 - 総ページ数: {total_pages}
 - ファイル名: {filename}
-- スキャン範囲: 1〜{scan_end}ページ目
+- スキャン範囲: 1〜{scan_end}ページ目{page_range_note}{image_layout_note}
 
 【最小構成単位の判断基準】
 - 「第一部」「第二部」のような**大区分（部）**がある場合：
@@ -387,6 +716,13 @@ class PdfProcessor:
                 # Note: google-generativeai >= 0.5.0 supports response_schema
                 response_schema=toc_schema
             )
+            # Drop the page images before post-processing: a continuity retry renders its own
+            # (larger) page set, and both sets would otherwise be held at once
+            del content, images
+            
+            if not result and text_toc_range:
+                logger.warning("Vision TOC extraction on text-layer candidate pages returned None")
+                return self._extract_toc_full_range(pdf_path, gemini_service, gcs_service, job_id, scan_end)
             
             if not result:
                 error_details = {"stage": "api_call", "error": "Vision API returned None"}
@@ -394,28 +730,7 @@ class PdfProcessor:
                 self._save_toc_error(gcs_service, job_id, error_details)
                 return None
                 
-            # Post-process: Ensure start pages are integers
-            chapters = result.get("chapters_in_this_volume", [])
-            for ch in chapters:
-                if isinstance(ch.get("content_start_page"), str):
-                    try:
-                        ch["content_start_page"] = int(re.sub(r'\D', '', ch["content_start_page"]))
-                    except:
-                        ch["content_start_page"] = None
-            
-            # Sort chapters by content_start_page to ensure correct order
-            chapters = [ch for ch in chapters if isinstance(ch.get("content_start_page"), int)]
-            chapters.sort(key=lambda x: x.get("content_start_page", 0))
-            
-            # Calculate end pages based on sorted order
-            for i, ch in enumerate(chapters):
-                start = ch.get("content_start_page")
-                chapter_end = total_pages
-                if i + 1 < len(chapters):
-                    next_start = chapters[i+1].get("content_start_page")
-                    if isinstance(next_start, int) and next_start > start:
-                        chapter_end = next_start - 1
-                ch["content_end_page"] = chapter_end
+            chapters = self._assign_toc_page_ranges(result.get("chapters_in_this_volume", []), total_pages)
             
             # Quality validation
             is_valid, reason = self._validate_toc_quality(chapters)
@@ -425,14 +740,23 @@ class PdfProcessor:
             
             # Chapter continuity check
             is_continuous, gaps = self._check_chapter_continuity(chapters)
+            
+            # The text-layer heuristic can pick a numbered list in the front matter, or miss
+            # part of a TOC split by a sparse page: redo a failed narrowed pass on the full range
+            if text_toc_range and not (is_valid and is_continuous):
+                logger.warning(f"TOC from text-layer candidate pages {start_page+1}-{end_page} failed validation")
+                return self._extract_toc_full_range(pdf_path, gemini_service, gcs_service, job_id, scan_end)
+            
             if not is_continuous:
                 logger.warning(f"Chapter continuity gaps detected: {gaps}")
                 if not is_retry:
                     logger.info("Retrying with expanded scan range (50 pages)...")
-                    return self.extract_toc_with_ai(
+                    retry_result = self.extract_toc_with_ai(
                         pdf_path, gemini_service, gcs_service, job_id,
                         override_end_page=50, is_retry=True
                     )
+                    self._save_toc_cache(gcs_service, cache_key, retry_result)
+                    return retry_result
                 else:
                     logger.warning("Gaps still present after retry. Proceeding with current result.")
                 
@@ -451,6 +775,7 @@ class PdfProcessor:
                 "raw_result": result
             })
             
+            self._save_toc_cache(gcs_service, cache_key, result)
             return result
             
         except Exception as e:
@@ -464,6 +789,245 @@ class PdfProcessor:
             self._save_toc_error(gcs_service, job_id, error_details)
             return None
     
+    def _extract_toc_full_range(self, pdf_path: str, gemini_service: Any, gcs_service: Any, job_id: str, scan_end: int) -> Optional[Dict]:
+        """Vision TOC extraction over the whole scan range (no text-layer narrowing, no outline)."""
+        get_logger().info(f"Retrying Vision TOC extraction on the full scan range (pages {TOC_SCAN_START_PAGE+1}-{scan_end})...")
+        # override_end_page skips the outline and the narrowing; the continuity retry stays available
+        return self.extract_toc_with_ai(pdf_path, gemini_service, gcs_service, job_id, override_end_page=scan_end)
+    
+    def _assign_toc_page_ranges(self, raw_chapters: List[Dict], total_pages: int) -> List[Dict]:
+        """
+        Coerces content_start_page to int (dropping entries without one), sorts by it and
+        sets content_end_page from the next chapter's start.
+        """
+        # Collect (start, position, chapter) so the sort compares plain tuples
+        keyed = []
+        for position, ch in enumerate(raw_chapters):
+            start = ch.get("content_start_page")
+            if isinstance(start, str):
+                try:
+                    start = int(_RE_NON_DIGIT.sub('', start))
+                except ValueError:
+                    continue
+                ch["content_start_page"] = start
+            if isinstance(start, int):
+                keyed.append((start, position, ch))
+        
+        # Sort chapters by content_start_page to ensure correct order
+        # (position breaks ties, keeping the stable order and never comparing dicts)
+        keyed.sort()
+        starts = [start for start, _, _ in keyed]
+        chapters = [ch for _, _, ch in keyed]
+        
+        # Calculate end pages based on sorted order (last chapter runs to the end of the PDF)
+        for ch, start, next_start in zip(chapters, starts, starts[1:]):
+            ch["content_end_page"] = next_start - 1 if next_start > start else total_pages
+        if chapters:
+            chapters[-1]["content_end_page"] = total_pages
+        return chapters
+
+    def _toc_from_outline(self, pdf_path: str) -> Optional[Dict]:
+        """
+        Builds a TOC result (same shape as the Vision result) from the PDF's outline.
+        Uses level-1 entries, or level 2 when level 1 holds parts (第X部 / Part X).
+        Returns None when the outline is missing, too short or fails quality validation.
+        """
+        logger = get_logger()
+        try:
+            doc = self._get_document(pdf_path)
+            outline = doc.get_toc(simple=True)
+        except Exception as e:
+            logger.warning(f"Failed to read PDF outline: {e}")
+            return None
+        
+        total_pages = len(doc)
+        entries_by_level = {1: [], 2: []}
+        for level, title, page in outline:
+            title = title.strip()
+            if level in entries_by_level and 1 <= page <= total_pages and title and not _RE_OUTLINE_SKIP.match(title):
+                entries_by_level[level].append((title, page))
+        
+        entries = entries_by_level[1]
+        part_count = sum(1 for title, _ in entries if _RE_OUTLINE_PART.match(title))
+        if entries and part_count * 2 > len(entries) and len(entries_by_level[2]) >= _OUTLINE_MIN_ENTRIES:
+            entries = entries_by_level[2]
+        
+        if len(entries) < _OUTLINE_MIN_ENTRIES:
+            logger.info(f"PDF outline too short for TOC: {len(entries)} entries")
+            return None
+        
+        # Outline pages are physical (1-based) pages, which is what extract_chapters_from_toc expects
+        chapters = self._assign_toc_page_ranges(
+            [{"number": "", "title": title, "content_start_page": page} for title, page in entries],
+            total_pages
+        )
+        is_valid, reason = self._validate_toc_quality(chapters)
+        if not is_valid:
+            logger.info(f"PDF outline rejected as TOC: {reason}")
+            return None
+        
+        return {
+            "volume_info": "",
+            "has_toc_page": True,
+            "toc_source": "pdf_outline",
+            "chapters_in_this_volume": chapters
+        }
+
+    def _find_text_toc_range(self, pdf_path: str, start_page: int, end_page: int) -> Optional[Tuple[int, int]]:
+        """
+        Returns [first, last + 2) around the first run of pages in [start_page, end_page)
+        whose text layer has _TOC_PAGE_MIN_ENTRY_LINES+ lines ending in a page number, or None.
+        The extra trailing page keeps a sparse last TOC page that fell below the threshold.
+        """
+        try:
+            with self._doc_lock:
+                doc = self._get_document(pdf_path)
+                first = last = None
+                for i in range(start_page, end_page):
+                    text = doc[i].get_text("text", flags=_PAGE_TEXT_FLAGS)
+                    if len(_RE_TOC_ENTRY_LINE.findall(text)) >= _TOC_PAGE_MIN_ENTRY_LINES:
+                        if first is None:
+                            first = i
+                        last = i
+                    elif first is not None:
+                        break
+        except Exception as e:
+            get_logger().warning(f"Text layer TOC detection failed: {e}")
+            return None
+        if first is None:
+            return None
+        return first, min(last + 2, end_page)
+
+    def _render_toc_pages(self, pdf_path: str, start_page: int, end_page: int) -> Iterator[Tuple[str, bytes]]:
+        """
+        Renders pages [start_page, end_page) to (mime_type, image bytes) in parallel, yielding them in page order.
+        With TOC_PAGES_PER_IMAGE > 1, each image stacks that many consecutive pages vertically.
+        MuPDF releases the GIL while rasterizing, so threads scale with the TOC_RENDER_WORKERS vCPUs.
+        Each worker opens its own fitz.Document since handles must not be shared across threads.
+        Yielding per worker slice lets the caller convert and drop raw bytes as they arrive.
+        """
+        page_indices = list(range(start_page, end_page))
+        if not page_indices:
+            return
+        
+        # Whole images are the unit of work so a stacked image never spans two workers
+        groups = [page_indices[i:i + TOC_PAGES_PER_IMAGE] for i in range(0, len(page_indices), TOC_PAGES_PER_IMAGE)]
+        workers = min(TOC_RENDER_WORKERS, len(groups))
+        chunk_size = -(-len(groups) // workers)  # ceil division
+        chunks = [groups[i:i + chunk_size] for i in range(0, len(groups), chunk_size)]
+        
+        def render_groups(doc: "fitz.Document", chunk_groups: List[List[int]]) -> List[Tuple[str, bytes]]:
+            rendered_images = []
+            for indices in chunk_groups:
+                pages = [doc[i] for i in indices]
+                matrix = self._toc_render_matrix(pages)
+                pixmaps = [
+                    page.get_pixmap(matrix=matrix, colorspace=_TOC_IMAGE_COLORSPACE, alpha=False)
+                    for page in pages
+                ]
+                pix = pixmaps[0] if len(pixmaps) == 1 else self._stack_pixmaps(pixmaps)
+                rendered_images.append(self._encode_toc_image(pix))
+                pix = pixmaps = None  # Free MuPDF's pixel buffers before rendering the next image
+            return rendered_images
+        
+        def render_chunk(chunk_groups: List[List[int]]) -> List[Tuple[str, bytes]]:
+            with fitz.open(pdf_path) as doc:
+                return render_groups(doc, chunk_groups)
+        
+        if len(chunks) == 1:
+            # Single worker: render on the shared handle instead of parsing the PDF again
+            with self._doc_lock:
+                yield from render_groups(self._get_document(pdf_path), chunks[0])
+            return
+        
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            for rendered_chunk in executor.map(render_chunk, chunks):
+                yield from rendered_chunk
+
+    def _stack_pixmaps(self, pixmaps: List["fitz.Pixmap"]) -> "fitz.Pixmap":
+        """Stacks page pixmaps top to bottom on a white canvas as wide as the widest page."""
+        width = max(pix.width for pix in pixmaps)
+        height = sum(pix.height for pix in pixmaps)
+        canvas = fitz.Pixmap(_TOC_IMAGE_COLORSPACE, fitz.IRect(0, 0, width, height), False)
+        canvas.clear_with(255)
+        y = 0
+        for pix in pixmaps:
+            pix.set_origin(0, y)
+            canvas.copy(pix, pix.irect)
+            y += pix.height
+        return canvas
+
+    def _encode_toc_image(self, pix: "fitz.Pixmap") -> Tuple[str, bytes]:
+        """Encodes a rendered TOC page per TOC_IMAGE_FORMAT ("auto" keeps the smaller encoding)."""
+        if TOC_IMAGE_FORMAT == "png":
+            return "image/png", pix.tobytes("png")
+        jpeg = ("image/jpeg", pix.tobytes("jpeg", jpg_quality=TOC_IMAGE_JPEG_QUALITY))
+        if TOC_IMAGE_FORMAT == "jpeg":
+            return jpeg
+        png = ("image/png", pix.tobytes("png"))
+        return min(jpeg, png, key=lambda encoded: len(encoded[1]))
+
+    def _toc_render_matrix(self, pages: List[Any]) -> "fitz.Matrix":
+        """
+        Scale matrix for rendering the pages of one TOC image at TOC_IMAGE_DPI, shrunk so
+        that the long edge of the image (the pages stacked vertically, see _stack_pixmaps)
+        never exceeds TOC_IMAGE_MAX_EDGE pixels (large-format scans, stacked pages).
+        """
+        scale = _TOC_RENDER_SCALE
+        long_edge_pt = max(max(page.rect.width for page in pages), sum(page.rect.height for page in pages))
+        # Each page's pixmap can round up by a pixel, so leave one pixel per stacked page
+        max_edge = TOC_IMAGE_MAX_EDGE - (len(pages) - 1)
+        if long_edge_pt * scale > max_edge:
+            scale = max_edge / long_edge_pt
+        return fitz.Matrix(scale, scale)
+
+    def _toc_cache_key(self, pdf_path: str, scan_end: int) -> Optional[str]:
+        """
+        Cache key for a Vision TOC result: PDF content hash plus every setting
+        that changes what Gemini sees (model, render size, scan range).
+        """
+        try:
+            digest = hashlib.sha256()
+            with open(pdf_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+        except OSError as e:
+            get_logger().warning(f"Failed to hash PDF for TOC cache: {e}")
+            return None
+        image_format = "png" if TOC_IMAGE_FORMAT == "png" else f"{TOC_IMAGE_FORMAT}{TOC_IMAGE_JPEG_QUALITY}"
+        if TOC_PAGES_PER_IMAGE > 1:
+            image_format += f"_x{TOC_PAGES_PER_IMAGE}"
+        return (f"{digest.hexdigest()}_{TOC_EXTRACTION_MODEL}_{TOC_IMAGE_DPI}dpi_{TOC_IMAGE_MAX_EDGE}px"
+                f"_{image_format}_p{TOC_SCAN_START_PAGE}-{scan_end}")
+
+    def _load_toc_cache(self, gcs_service: Any, cache_key: Optional[str]) -> Optional[Dict]:
+        """Returns a cached Vision TOC result from GCS, or None on miss/error."""
+        if not gcs_service or not cache_key:
+            return None
+        try:
+            blob = gcs_service.bucket.blob(f"{_TOC_CACHE_PREFIX}/{cache_key}.json")
+            return loads_json(blob.download_as_bytes())
+        except NotFound:
+            return None
+        except Exception as e:
+            get_logger().warning(f"Failed to read TOC cache: {e}")
+            return None
+
+    def _save_toc_cache(self, gcs_service: Any, cache_key: Optional[str], result: Optional[Dict]):
+        """Stores a Vision TOC result in GCS when it is usable for chapter splitting (2+ chapters)."""
+        if not gcs_service or not cache_key or not result:
+            return
+        if len(result.get("chapters_in_this_volume", [])) < 2:
+            return
+        try:
+            gcs_service.bucket.blob(f"{_TOC_CACHE_PREFIX}/{cache_key}.json").upload_from_string(
+                dumps_json(result),
+                content_type="application/json"
+            )
+            get_logger().info(f"Saved Vision TOC result to {_TOC_CACHE_PREFIX}/{cache_key}.json")
+        except Exception as e:
+            get_logger().warning(f"Failed to save TOC cache: {e}")
+
     def _save_toc_error(self, gcs_service: Any, job_id: str, error_details: Dict):
         """Saves TOC extraction errors to GCS for debugging."""
         if not gcs_service or not job_id or not error_details:
@@ -471,18 +1035,16 @@ class PdfProcessor:
         try:
             blob = gcs_service.bucket.blob(f"jobs/{job_id}/errors.json")
             
-            # Load existing errors if any
-            existing = {}
-            if blob.exists():
-                existing = json.loads(blob.download_as_text())
-            
-            existing["toc_extraction"] = error_details
+            # errors.json is only written from here, so the in-process buffer is the
+            # current content: a single PUT, no exists()/download round-trips
+            errors = self._error_buffer.setdefault(job_id, {})
+            errors["toc_extraction"] = error_details
             
             blob.upload_from_string(
-                json.dumps(existing, ensure_ascii=False, indent=2),
+                dumps_json(errors, indent=True),
                 content_type="application/json"
             )
-            get_logger().debug(f"Saved TOC error details to jobs/{job_id}/errors.json")
+            get_logger().info(f"Saved TOC error details to jobs/{job_id}/errors.json")
         except Exception as e:
             get_logger().warning(f"Failed to save error details: {e}")
 
@@ -491,7 +1053,6 @@ class PdfProcessor:
         TOC抽出結果の品質を検証。
         Returns: (is_valid, reason)
         """
-        import re
         if len(chapters) < 2:
             return False, f"章数不足: {len(chapters)}"
         
@@ -512,12 +1073,7 @@ class PdfProcessor:
             return False, "ページ順序が連続していない"
         
         # ゴミ文字チェック（Contents, 目次, 3桁以上の数字+第, OCRノイズ）
-        garbage_patterns = [r'Contents', r'目次', r'\d{3,}第', r'[■□◆◇●○]{3,}']
-        garbage_count = 0
-        for ch in chapters:
-            title = str(ch.get("title", ""))
-            if any(re.search(p, title) for p in garbage_patterns):
-                garbage_count += 1
+        garbage_count = sum(1 for ch in chapters if _RE_TOC_GARBAGE.search(str(ch.get("title", ""))))
         
         if garbage_count / len(chapters) > 0.2:
             return False, f"ゴミ文字の混入率が高い: {garbage_count}/{len(chapters)}"
@@ -530,18 +1086,17 @@ class PdfProcessor:
         Returns: (is_continuous, gaps)
           - gaps: [(start, end), ...] 例: [(1, 5)] = 第1章と第5章の間にギャップ
         """
-        import re
         logger = get_logger()
         
         chapter_nums = []
         for ch in chapters:
             number = ch.get("number", "")
-            m = re.search(r'第(\d+)章', number)
+            m = _RE_TOC_CHAPTER_NUMBER.search(number)
             if m:
                 chapter_nums.append(int(m.group(1)))
         
         if not chapter_nums:
-            logger.debug("No chapter numbers found, skipping continuity check")
+            logger.info("No chapter numbers found, skipping continuity check")
             return True, []  # 章番号がない場合はスキップ
         
         sorted_nums = sorted(set(chapter_nums))
@@ -553,20 +1108,27 @@ class PdfProcessor:
         if gaps:
             logger.warning(f"Chapter gaps detected: {gaps} (extracted: {sorted_nums})")
         else:
-            logger.debug(f"Chapter continuity OK: {sorted_nums}")
+            logger.info(f"Chapter continuity OK: {sorted_nums}")
         
         return len(gaps) == 0, gaps
 
     def extract_chapters_from_toc(self, pdf_path: str, toc_data: Dict) -> List[Dict[str, str]]:
-        """Extracts text for chapters based on TOC page ranges."""
+        """
+        Extracts text for chapters based on TOC page ranges.
+        Uses PyMuPDF (C engine) with the processor's shared Document. Pages are
+        read and cleaned once each, even when chapter ranges overlap.
+        """
         logger = get_logger()
         logger.info("Extracting chapters based on Vision TOC data...")
-        reader = pypdf.PdfReader(pdf_path)
-        total_pages = len(reader.pages)
         
         extracted_chapters = []
         chapters_list = toc_data.get("chapters_in_this_volume", [])
         
+        doc = self._get_document(pdf_path)
+        total_pages = len(doc)
+        
+        # 1. Resolve page ranges: (full_title, start_page, end_page, p_start, p_end)
+        chapter_ranges = []
         for ch in chapters_list:
             title = ch.get("title", "Untitled")
             number = ch.get("number", "")
@@ -580,25 +1142,26 @@ class PdfProcessor:
                 continue
                 
             # Convert 1-based page numbers to 0-based indices
-            # pypdf is 0-indexed
+            # fitz is 0-indexed
             p_start = max(0, start_page - 1)
             p_end = min(total_pages, end_page) # end is exclusive in slicing logic usually, but here we iterate
             
             if p_start >= total_pages:
                 continue
-                
-            chapter_text_parts = []
-            for i in range(p_start, p_end):
-                try:
-                    text = reader.pages[i].extract_text()
-                    if text:
-                        chapter_text_parts.append(text)
-                except Exception as e:
-                    logger.warning(f"Error extracting page {i+1}: {e}")
-            
-            full_text = "".join(chapter_text_parts)
-            full_text = self.clean_extracted_text(full_text)
             
+            chapter_ranges.append((full_title, start_page, end_page, p_start, p_end))
+        
+        # 2. Extract and clean every page needed by any chapter exactly once
+        needed_pages = sorted({i for _, _, _, p_start, p_end in chapter_ranges for i in range(p_start, p_end)})
+        page_texts = self._clean_page_texts(pdf_path, needed_pages)
+        
+        # 3. Assemble chapters from the cleaned page cache
+        cleaned_texts = [
+            "\n".join(page_texts[i] for i in range(p_start, p_end) if page_texts[i])
+            for _, _, _, p_start, p_end in chapter_ranges
+        ]
+        
+        for (full_title, start_page, end_page, _, _), full_text in zip(chapter_ranges, cleaned_texts):
             if full_text:
                 extracted_chapters.append({
                     "title": full_title,
@@ -3,19 +3,32 @@ Chapter Worker - Processes a single chapter via Cloud Tasks.
 
 This worker:
 1. Receives job_id and chapter_number from the task payload.
-2. Reads chapter content from GCS (jobs/{job_id}/input_chapters.json).
+2. Reads chapter content from GCS (jobs/{job_id}/input_chapter_{n}.json,
+   falling back to the whole-book jobs/{job_id}/input_chapters.json).
 3. Calls Gemini to generate a summary.
 4. Saves the result to GCS (jobs/{job_id}/chapter_{n}.json).
 """
 import json
 import functions_framework
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 from config import BUCKET_NAME
 from services.gcs_service import GcsService
 from services.gemini_service import GeminiService
 from services.logging_service import JobLogger
 from services.job_tracker import JobTracker
+from services.json_utils import dumps_json, loads_json
+
+# Parsed input files kept across warm invocations (e.g. Cloud Tasks retries),
+# keyed by (blob name, generation) so a re-prepared job is never served stale data
+_INPUT_CACHE: Dict[Tuple[str, int], Any] = {}
+_INPUT_CACHE_MAX_ENTRIES = 8
+
+# Chapter content sent to Gemini is capped at this many characters (roughly as many
+# tokens for Japanese text); the cut moves back to a line break within the last
+# _TRUNCATE_BOUNDARY_WINDOW characters so the model never sees half a paragraph
+_CHAPTER_MAX_CHARS = 50000
+_TRUNCATE_BOUNDARY_WINDOW = 2000
 
 
 @functions_framework.http
@@ -46,6 +59,7 @@ def process_chapter(request):
         chapter_number = request_json.get("chapter_number")
         book_title = request_json.get("book_title", "Unknown")
         existing_concepts = request_json.get("existing_concepts", [])
+        prompt_cache = request_json.get("prompt_cache")
         
         # Initialize structured logger and job tracker
         logger = JobLogger(job_id)
@@ -71,7 +85,8 @@ def process_chapter(request):
             gemini, 
             chapter_data, 
             book_title, 
-            existing_concepts
+            existing_concepts,
+            prompt_cache
         )
         
         # 3. Save result to GCS
@@ -97,22 +112,83 @@ def process_chapter(request):
 
 def _read_chapter_input(gcs: GcsService, job_id: str, chapter_number: int) -> Dict:
     """Reads the chapter content from GCS input file."""
-    blob = gcs.bucket.blob(f"jobs/{job_id}/input_chapters.json")
-    if not blob.exists():
-        return None
+    # Per-chapter shard: O(1) download regardless of book size
+    chapter = _load_input_json(gcs, f"jobs/{job_id}/input_chapter_{chapter_number}.json")
+    if chapter is not None:
+        return chapter
     
-    all_chapters = json.loads(blob.download_as_text())
-    if chapter_number >= len(all_chapters):
+    # Jobs prepared before sharding only have the whole-book file
+    all_chapters = _load_input_json(gcs, f"jobs/{job_id}/input_chapters.json")
+    if all_chapters is None or chapter_number >= len(all_chapters):
         return None
     
     return all_chapters[chapter_number]
 
 
+def _load_input_json(gcs: GcsService, blob_name: str) -> Optional[Any]:
+    """
+    Returns the parsed JSON of an input blob, or None if it does not exist.
+    get_blob fetches metadata only; the body is downloaded and parsed once per generation.
+    """
+    blob = gcs.bucket.get_blob(blob_name)
+    if blob is None:
+        return None
+    
+    key = (blob_name, blob.generation)
+    if key not in _INPUT_CACHE:
+        if len(_INPUT_CACHE) >= _INPUT_CACHE_MAX_ENTRIES:
+            # Evict the oldest entry (dicts keep insertion order)
+            _INPUT_CACHE.pop(next(iter(_INPUT_CACHE)))
+        _INPUT_CACHE[key] = loads_json(blob.download_as_bytes())
+    return _INPUT_CACHE[key]
+
+
+def _truncate_at_boundary(content: str, max_chars: int) -> str:
+    """
+    Cuts content to at most max_chars, preferring a paragraph break (blank line) and then
+    a line break near the limit; falls back to a hard cut when neither is close.
+    """
+    window_start = max_chars - _TRUNCATE_BOUNDARY_WINDOW
+    for separator in ("\n\n", "\n"):
+        cut = content.rfind(separator, window_start, max_chars)
+        if cut != -1:
+            return content[:cut]
+    return content[:max_chars]
+
+
+# Chapter prompt pieces shared by the cached prefix and the full prompt
+_CHAPTER_PROMPT_INSTRUCTIONS = """
+    Analyze this chapter and provide a detailed summary in Japanese.
+    If the chapter focuses on a specific concept or person (dictionary style), start with a clear definition.
+    """
+_CHAPTER_PROMPT_OUTPUT_FORMAT = """
+    Output JSON:
+    {
+      "summary": "Definition or Introduction (1-2 sentences)\\n\\n- Point 1\\n- Point 2\\n- Point 3\\n- Point 4\\n- Point 5 (Key insights and business applications)",
+      "keyConcepts": ["Concept1", "Concept2", "Concept3"]
+    }
+    """
+
+
+def chapter_prompt_prefix(book_title: str, existing_concepts: list) -> str:
+    """
+    Fixed part of the chapter prompt (instructions, book title, concepts, output format).
+    It is identical for every chapter of a book, so prepare_book can put it in Gemini's context cache.
+    """
+    concepts_str = ", ".join(existing_concepts[:100])
+    
+    return _CHAPTER_PROMPT_INSTRUCTIONS + f"""
+    Book Title: {book_title}
+    Existing Concepts (prefer these): {concepts_str}
+    """ + _CHAPTER_PROMPT_OUTPUT_FORMAT
+
+
 def _generate_chapter_summary(
     gemini: GeminiService, 
     chapter_data: Dict, 
     book_title: str,
-    existing_concepts: list
+    existing_concepts: list,
+    prompt_cache: Optional[str] = None
 ) -> Dict[str, Any]:
     """Generates summary for a single chapter using Gemini."""
     
@@ -120,30 +196,32 @@ def _generate_chapter_summary(
     title = chapter_data.get("title", "Chapter")
     
     # Truncate if too long (50k chars per chapter)
-    if len(content) > 50000:
-        content = content[:50000] + "\n...(Truncated)..."
+    if len(content) > _CHAPTER_MAX_CHARS:
+        content = _truncate_at_boundary(content, _CHAPTER_MAX_CHARS) + "\n...(Truncated)..."
     
-    concepts_str = ", ".join(existing_concepts[:100])
+    chapter_prompt = f"""
+    Chapter Title: {title}
     
-    prompt = f"""
-    Analyze this chapter and provide a detailed summary in Japanese.
-    If the chapter focuses on a specific concept or person (dictionary style), start with a clear definition.
+    Chapter Content:
+    {content}
+    """
     
+    result = None
+    if prompt_cache:
+        # Single attempt: an expired cache or API error falls back to the full prompt below
+        result = gemini.generate_content(chapter_prompt, max_retries=1, cached_content=prompt_cache)
+    if not result:
+        # Full prompt in its original order: the output format comes after the chapter content
+        concepts_str = ", ".join(existing_concepts[:100])
+        prompt = _CHAPTER_PROMPT_INSTRUCTIONS + f"""
     Book Title: {book_title}
     Chapter Title: {title}
     Existing Concepts (prefer these): {concepts_str}
     
     Chapter Content:
     {content}
-    
-    Output JSON:
-    {{
-      "summary": "Definition or Introduction (1-2 sentences)\\n\\n- Point 1\\n- Point 2\\n- Point 3\\n- Point 4\\n- Point 5 (Key insights and business applications)",
-      "keyConcepts": ["Concept1", "Concept2", "Concept3"]
-    }}
-    """
-    
-    result = gemini.generate_content(prompt, max_retries=3)
+    """ + _CHAPTER_PROMPT_OUTPUT_FORMAT
+        result = gemini.generate_content(prompt, max_retries=3)
     
     if not result:
         return {
@@ -161,10 +239,10 @@ def _save_chapter_result(gcs: GcsService, job_id: str, chapter_number: int, resu
     """Saves the chapter summary result to GCS."""
     blob = gcs.bucket.blob(f"jobs/{job_id}/chapter_{chapter_number}.json")
     blob.upload_from_string(
-        json.dumps(result, ensure_ascii=False, indent=2),
+        dumps_json(result, indent=True),
         content_type="application/json"
     )
-    logger.logger.debug(f"Saved chapter {chapter_number} result to GCS")
+    logger.logger.info(f"Saved chapter {chapter_number} result to GCS")
 
 
 
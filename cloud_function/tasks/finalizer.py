@@ -8,19 +8,55 @@ This finalizer:
 4. Creates the final Markdown file.
 5. Updates the Books/Concepts indexes.
 """
+import hashlib
 import json
 import re
 import os
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from typing import Dict, Any, List, Optional, Set
 import functions_framework
+from google.cloud.exceptions import NotFound
 
-from config import BUCKET_NAME
+from config import BUCKET_NAME, SUMMARY_CACHE_ENABLED
 from services.gcs_service import GcsService
 from services.gemini_service import GeminiService
 from services.index_service import IndexService, ConceptNormalizer
-from services.logging_service import JobLogger
+from services.logging_service import JobLogger, get_logger
 from services.job_tracker import JobTracker
+from services.json_utils import dumps_json, loads_json
+
+# Chapter result name after the "jobs/{job_id}/chapter_" prefix: "12.json"
+_RE_CHAPTER_RESULT_NAME = re.compile(r'(\d+)\.json')
+
+# Concurrent chapter result downloads in _read_all_chapter_results
+_CHAPTER_READ_WORKERS = 16
+
+# Characters not allowed in vault file names, mapped to "_" (table lookup instead of re.sub)
+_TITLE_UNSAFE_CHARS_TABLE = str.maketrans(dict.fromkeys('\\/:*?"<>|', '_'))
+
+# Obsidian wikilink formatter for concept lists
+_LINK_FMT = "[[{}]]".format
+
+# Book summary prompt budget: concepts listed (most frequent across chapters first) and
+# characters kept per chapter summary (cut at a line break; the intro + first bullets remain)
+_BOOK_PROMPT_MAX_CONCEPTS = 20
+_BOOK_PROMPT_SUMMARY_CHARS = 600
+
+# One chapter section of the book Markdown
+_CHAPTER_MD_TEMPLATE = """
+### {title}
+{summary}
+
+**Key Concepts**: {concepts}
+"""
+
+# GCS prefix for stored book-level summaries, keyed by model + prompt hash
+_SUMMARY_CACHE_PREFIX = "summary_cache"
+# Stored summaries older than this are regenerated (and overwritten)
+_SUMMARY_CACHE_MAX_AGE = timedelta(days=30)
 
 
 @functions_framework.http
@@ -30,7 +66,8 @@ def finalize_book(request):
     
     Expected payload:
     {
-        "job_id": "uuid-xxx"
+        "job_id": "uuid-xxx",
+        "refresh_summary": false  # optional: regenerate instead of reusing a cached book summary
     }
     
     Can also be triggered by a scheduler to check for completed jobs.
@@ -64,10 +101,8 @@ def finalize_book(request):
         
         # Check completion by counting existing chapter result files
         # This avoids race conditions from concurrent metadata.json updates
-        completed_count = sum(
-            1 for i in range(total_chapters)
-            if gcs.bucket.blob(f"jobs/{job_id}/chapter_{i}.json").exists()
-        )
+        completed = _list_completed_chapters(gcs, job_id)
+        completed_count = sum(1 for i in range(total_chapters) if i in completed)
         
         if completed_count < total_chapters:
             return json.dumps({
@@ -75,14 +110,16 @@ def finalize_book(request):
             }), 429
         
         # 2. Read all chapter results
-        chapter_summaries = _read_all_chapter_results(gcs, job_id, total_chapters)
+        chapter_summaries = _read_all_chapter_results(gcs, job_id, total_chapters, completed)
         
         # 3. Generate book-level summary
         book_summary = _generate_book_summary(
             gemini,
             metadata.get("book_title", "Unknown"),
             metadata.get("category", "Business"),
-            chapter_summaries
+            chapter_summaries,
+            gcs,
+            refresh=bool(request_json.get("refresh_summary"))
         )
         
         # 4. Normalize concepts
@@ -111,10 +148,10 @@ def finalize_book(request):
             chapter["keyConcepts"] = [c["normalized"] for c in chapter_concepts]
         
         # 6. Generate markdown
-        md_content = _format_as_markdown(final_data, metadata.get("file_id", ""))
+        md_content = _format_as_markdown(final_data, metadata.get("file_id", ""), datetime.now().strftime('%Y-%m-%d'))
         
         # 7. Write to Obsidian Vault
-        clean_title = re.sub(r'[\\/:*?"<>|]', '_', final_data["title"])
+        clean_title = final_data["title"].translate(_TITLE_UNSAFE_CHARS_TABLE)
         md_path = f"01_Reading/{clean_title}.md"
         gcs_uri = gcs.write_to_obsidian_vault(md_path, md_content)
         logger.log_stage("finalization", "file_written", gcs_uri=gcs_uri)
@@ -135,6 +172,10 @@ def finalize_book(request):
         
         # 10. Mark job as complete
         tracker.mark_completed(gcs_uri)
+        
+        # 11. Release the chapter prompt cache instead of waiting for its TTL
+        if metadata.get("prompt_cache"):
+            gemini.delete_prompt_cache(metadata["prompt_cache"])
         logger.log_stage("finalization", "completed")
         
         return json.dumps({
@@ -154,44 +195,94 @@ def finalize_book(request):
 
 
 def _read_job_metadata(gcs: GcsService, job_id: str) -> Optional[Dict]:
-    """Reads job metadata from GCS."""
+    """Reads job metadata from GCS (single GET; a missing object raises NotFound)."""
     blob = gcs.bucket.blob(f"jobs/{job_id}/metadata.json")
-    if not blob.exists():
+    try:
+        return loads_json(blob.download_as_bytes())
+    except NotFound:
         return None
-    return json.loads(blob.download_as_text())
-
-
-def _read_all_chapter_results(gcs: GcsService, job_id: str, total_chapters: int) -> List[Dict]:
-    """Reads all chapter result files from GCS."""
-    results = []
-    for i in range(total_chapters):
-        blob = gcs.bucket.blob(f"jobs/{job_id}/chapter_{i}.json")
-        if blob.exists():
-            results.append(json.loads(blob.download_as_text()))
-        else:
-            results.append({
+
+
+def _list_completed_chapters(gcs: GcsService, job_id: str) -> Set[int]:
+    """
+    Returns the chapter numbers that have a result file, using a single
+    prefix listing instead of one exists() request per chapter.
+    """
+    prefix = f"jobs/{job_id}/chapter_"
+    completed = set()
+    for blob in gcs.bucket.list_blobs(prefix=prefix):
+        match = _RE_CHAPTER_RESULT_NAME.fullmatch(blob.name[len(prefix):])
+        if match:
+            completed.add(int(match.group(1)))
+    return completed
+
+
+def _read_all_chapter_results(
+    gcs: GcsService,
+    job_id: str,
+    total_chapters: int,
+    completed: Optional[Set[int]] = None
+) -> List[Dict]:
+    """Reads all chapter result files from GCS, downloading them concurrently in chapter order."""
+    if completed is None:
+        completed = _list_completed_chapters(gcs, job_id)
+    bucket = gcs.bucket
+    
+    def read_chapter(i: int) -> Dict:
+        if i not in completed:
+            return {
                 "title": f"Chapter {i}",
                 "summary": "(Result not found)",
                 "keyConcepts": []
-            })
-    return results
+            }
+        result = loads_json(bucket.blob(f"jobs/{job_id}/chapter_{i}.json").download_as_bytes())
+        result["summary"] = _canonical_chapter_summary(result.get("summary", ""))
+        return result
+    
+    if total_chapters <= 1:
+        return [read_chapter(i) for i in range(total_chapters)]
+    
+    # Downloads are latency-bound: overlap the round-trips; map() keeps chapter order
+    with ThreadPoolExecutor(max_workers=min(_CHAPTER_READ_WORKERS, total_chapters)) as executor:
+        return list(executor.map(read_chapter, range(total_chapters)))
+
+
+def _canonical_chapter_summary(summary: Any) -> Any:
+    """
+    Chapter summary in its rendered form: a list (returned by some responses) is joined
+    line by line, and a missing or near-empty summary becomes a failure placeholder.
+    """
+    if isinstance(summary, list):
+        summary = '\n'.join(str(item) for item in summary)
+    if not summary or (isinstance(summary, str) and len(summary.strip()) < 10):
+        return "(Summary generation failed)"
+    return summary
 
 
 def _generate_book_summary(
     gemini: GeminiService,
     book_title: str,
     category: str,
-    chapter_summaries: List[Dict]
+    chapter_summaries: List[Dict],
+    gcs: Optional[GcsService] = None,
+    refresh: bool = False
 ) -> Dict[str, Any]:
-    """Generates the overall book summary from chapter summaries."""
+    """
+    Generates the overall book summary from chapter summaries.
+    
+    When gcs is given and SUMMARY_CACHE_ENABLED, a previous result for the identical
+    prompt is reused (re-runs of a finalize after a later step failed, etc.).
+    refresh=True skips the lookup and overwrites the stored result.
+    """
     
-    # Collect all concepts
-    all_concepts = set()
-    for cs in chapter_summaries:
-        all_concepts.update(cs.get("keyConcepts", []))
+    # Rank concepts by how many chapters mention them (ties keep chapter order, so the prompt is deterministic)
+    concept_counts = Counter(chain.from_iterable(
+        cs.get("keyConcepts", ()) for cs in chapter_summaries
+    ))
+    all_concepts = [c for c, _ in concept_counts.most_common(_BOOK_PROMPT_MAX_CONCEPTS)]
     
     chapter_summaries_text = "\n".join([
-        f"### {cs.get('title', 'Unknown')}\n{cs.get('summary', '')}"
+        f"### {cs.get('title', 'Unknown')}\n{_compact_chapter_summary(cs.get('summary', ''))}"
         for cs in chapter_summaries
     ])
     
@@ -207,7 +298,7 @@ def _generate_book_summary(
     Chapter Summaries:
     {chapter_summaries_text}
     
-    All Extracted Concepts: {", ".join(list(all_concepts)[:50])}
+    All Extracted Concepts: {", ".join(all_concepts)}
     
     Output JSON:
     {{
@@ -219,14 +310,19 @@ def _generate_book_summary(
     }}
     """
     
-    result = gemini.generate_content(prompt, max_retries=3)
+    cache_path = _summary_cache_path(gemini, prompt) if gcs and SUMMARY_CACHE_ENABLED else None
+    result = None if refresh else _load_summary_cache(gcs, cache_path)
+    if result is None:
+        result = gemini.generate_content(prompt, max_retries=3)
+        if result:
+            _save_summary_cache(gcs, cache_path, result)
     
     if not result:
         return {
             "title": book_title,
             "author": "Unknown",
             "suggestedSubfolder": "Other",
-            "allKeyConcepts": list(all_concepts)[:10],
+            "allKeyConcepts": all_concepts[:10],
             "summary": "Book summary generation failed."
         }
     
@@ -240,26 +336,78 @@ def _generate_book_summary(
     return result
 
 
-def _format_as_markdown(data: Dict[str, Any], original_file_id: str) -> str:
-    """Formats the summary data into a Markdown string."""
-    today = datetime.now().strftime('%Y-%m-%d')
+def _compact_chapter_summary(summary: Any) -> str:
+    """Chapter summary shortened to _BOOK_PROMPT_SUMMARY_CHARS for the book summary prompt."""
+    summary = str(summary)
+    if len(summary) <= _BOOK_PROMPT_SUMMARY_CHARS:
+        return summary
+    # Prefer a line break in the second half of the budget; otherwise hard cut
+    cut = summary.rfind("\n", _BOOK_PROMPT_SUMMARY_CHARS // 2, _BOOK_PROMPT_SUMMARY_CHARS)
+    if cut == -1:
+        cut = _BOOK_PROMPT_SUMMARY_CHARS
+    return summary[:cut] + "…"
+
+
+def _summary_cache_path(gemini: GeminiService, prompt: str) -> str:
+    """GCS path of the stored summary for this model + prompt."""
+    digest = hashlib.sha256(f"{gemini.model_name}\n{prompt}".encode("utf-8")).hexdigest()
+    return f"{_SUMMARY_CACHE_PREFIX}/{digest}.json"
+
+
+def _load_summary_cache(gcs: Optional[GcsService], cache_path: Optional[str]) -> Optional[Dict]:
+    """Returns a stored book summary from GCS, or None on miss/expiry/error."""
+    if not gcs or not cache_path:
+        return None
+    try:
+        blob = gcs.bucket.get_blob(cache_path)
+        if blob is None:
+            return None
+        if blob.updated and datetime.now(timezone.utc) - blob.updated > _SUMMARY_CACHE_MAX_AGE:
+            return None
+        get_logger().info(f"Reusing cached book summary {cache_path}")
+        return loads_json(blob.download_as_bytes())
+    except Exception as e:
+        get_logger().warning(f"Failed to read summary cache: {e}")
+        return None
+
+
+def _save_summary_cache(gcs: Optional[GcsService], cache_path: Optional[str], result: Dict):
+    """Stores a successful book summary in GCS."""
+    if not gcs or not cache_path:
+        return
+    try:
+        gcs.bucket.blob(cache_path).upload_from_string(
+            dumps_json(result),
+            content_type="application/json"
+        )
+    except Exception as e:
+        get_logger().warning(f"Failed to save summary cache: {e}")
+
+
+def _format_as_markdown(data: Dict[str, Any], original_file_id: str, today: Optional[str] = None) -> str:
+    """Formats the summary data into a Markdown string (processed_date = today, default: now)."""
+    if today is None:
+        today = datetime.now().strftime('%Y-%m-%d')
     pdf_url = f"https://drive.google.com/file/d/{original_file_id}/view" if original_file_id else ""
     
-    concepts_links = " ".join([f"[[{c}]]" for c in data.get('allKeyConcepts', [])])
+    concepts_links = " ".join(map(_LINK_FMT, data.get('allKeyConcepts', ())))
+    title = data.get('title')
+    author = data.get('author')
     
-    md = f"""---
-title: "{data.get('title')}"
-author: "{data.get('author')}"
+    # Accumulate pieces and join once (repeated += copies the whole document per chapter)
+    parts = [f"""---
+title: "{title}"
+author: "{author}"
 category: ["{data.get('suggestedSubfolder')}", "Business"]
 processed_date: {today}
 concepts: {json.dumps(data.get('allKeyConcepts', []), ensure_ascii=False)}
 source_url: "{pdf_url}"
 ---
 
-# {data.get('title')}
+# {title}
 
 ## Metadata
-- **Author**: {data.get('author')}
+- **Author**: {author}
 - **Source**: [Original PDF]({pdf_url})
 - **Topics**: {concepts_links}
 
@@ -267,27 +415,19 @@ source_url: "{pdf_url}"
 {data.get('summary')}
 
 ## Chapter Summaries
-"""
+"""]
 
-    for chapter in data.get('chapters', []):
-        chapter_summary = chapter.get('summary', '')
-        
-        # Handle case where summary is returned as a list
-        if isinstance(chapter_summary, list):
-            chapter_summary = '\n'.join(str(item) for item in chapter_summary)
-        
-        if not chapter_summary or (isinstance(chapter_summary, str) and len(chapter_summary.strip()) < 10):
-            chapter_summary = "(Summary generation failed)"
-        
-        chapter_concepts = " ".join([f"[[{c}]]" for c in chapter.get('keyConcepts', [])])
-        md += f"""
-### {chapter.get('title')}
-{chapter_summary}
-
-**Key Concepts**: {chapter_concepts}
-"""
+    # Summaries were canonicalized in _read_all_chapter_results
+    parts.extend(
+        _CHAPTER_MD_TEMPLATE.format(
+            title=chapter.get('title'),
+            summary=chapter.get('summary'),
+            concepts=" ".join(map(_LINK_FMT, chapter.get('keyConcepts', ())))
+        )
+        for chapter in data.get('chapters', ())
+    )
 
-    return md
+    return "".join(parts)
 
 
 # _mark_job_complete is now handled by tracker.mark_completed()
@@ -12,6 +12,20 @@ from collections import defaultdict
 from difflib import SequenceMatcher
 import sys
 
+try:
+    # Bit-parallel LCS: 2*LCS/(len1+len2) is an exact upper bound of SequenceMatcher.ratio()
+    from rapidfuzz.distance import Indel
+except ImportError:
+    Indel = None
+
+# Concepts index entry, clean or broken across lines:
+# "- [[concept]]: [[source1]], [[source2]]" / "- [ [concept ] ]: [ [source ] ], ..."
+# Matched on the raw text (every gap is \s, so line breaks inside an entry are fine)
+INDEX_ENTRY_PATTERN = re.compile(r'-\s+\[\s*\[([^\]]+)\]\s*\]\s*:\s*((?:\[\s*\[([^\]]+)\]\s*\](?:\s*,\s*)?)+)')
+INDEX_SOURCE_PATTERN = re.compile(r'\[\s*\[([^\]]+)\]\s*\]')
+# Parenthetical notation: "Japanese (English)" / "English（日本語）"
+PAREN_PATTERN = re.compile(r'(.+?)\s*[\(（]([^\)）]+)[\)）]')
+
 def parse_concepts_index(filepath):
     """Parse the concepts index file and extract concept -> sources mapping."""
     with open(filepath, 'r', encoding='utf-8') as f:
@@ -19,31 +33,14 @@ def parse_concepts_index(filepath):
     
     concepts = defaultdict(set)
     
-    # First, normalize the content by joining lines and removing extra whitespace
-    # Replace newlines with space, then collapse multiple spaces
-    normalized = ' '.join(content.split())
-    
-    # Pattern 1: Standard format - [[concept]]: [[source1]], [[source2]]
-    standard_pattern = r'- \[\[([^\]]+)\]\]\s*:\s*(\[\[[^\]]+\]\](?:\s*,\s*\[\[[^\]]+\]\])*)'
-    
-    for match in re.finditer(standard_pattern, normalized):
-        concept = match.group(1).strip()
-        sources_str = match.group(2)
-        sources = re.findall(r'\[\[([^\]]+)\]\]', sources_str)
-        for src in sources:
-            concepts[concept].add(src.strip())
-    
-    # Pattern 2: Multi-line format - [ [concept ] ]: [ [source ] ], [ [source2 ] ]
-    # After normalization: - [ [ concept ] ]: [ [ source ] ], [ [ source2 ] ]
-    multiline_pattern = r'- \[\s*\[([^\]]+)\]\s*\]\s*:\s*((?:\[\s*\[([^\]]+)\]\s*\](?:\s*,\s*)?)+)'
-    
-    for match in re.finditer(multiline_pattern, normalized):
-        concept = match.group(1).strip()
-        sources_str = match.group(2)
-        # Extract sources from [ [source] ] pattern
-        sources = re.findall(r'\[\s*\[([^\]]+)\]\s*\]', sources_str)
+    # One pass covers both the standard format ([[concept]]: [[source1]], [[source2]])
+    # and the multi-line format ([ [concept ] ]: [ [source ] ]); \s* also matches zero spaces.
+    # Whitespace is collapsed per captured name instead of copying the whole file first.
+    for match in INDEX_ENTRY_PATTERN.finditer(content):
+        concept = ' '.join(match.group(1).split())
+        sources = INDEX_SOURCE_PATTERN.findall(match.group(2))
         for src in sources:
-            concepts[concept].add(src.strip())
+            concepts[concept].add(' '.join(src.split()))
     
     return concepts
 
@@ -57,48 +54,71 @@ def find_hub_concepts(concepts, threshold=3):
             hubs[concept] = sources
     return dict(sorted(hubs.items(), key=lambda x: len(x[1]), reverse=True))
 
+def _normalize_for_similarity(concept):
+    """Normalization used when comparing concepts."""
+    return concept.lower().replace(' ', '').replace('（', '(').replace('）', ')')
+
 def find_similar_concepts(concepts, similarity_threshold=0.8):
     """Find concepts that might be duplicates based on string similarity."""
     concept_list = list(concepts.keys())
-    similar_pairs = []
+    # Normalize once per concept instead of once per pair
+    normalized = [_normalize_for_similarity(c) for c in concept_list]
+    lengths = [len(n) for n in normalized]
+    found = []  # (i, j, ratio) so ties keep the original pair order
+    matcher = SequenceMatcher(None)
     
-    for i, c1 in enumerate(concept_list):
-        for c2 in concept_list[i+1:]:
-            # Normalize for comparison
-            n1 = c1.lower().replace(' ', '').replace('（', '(').replace('）', ')')
-            n2 = c2.lower().replace(' ', '').replace('（', '(').replace('）', ')')
+    # SequenceMatcher caches its analysis of seq2, so each concept is set as seq2 once
+    # and compared against every earlier concept as seq1 (same (n1, n2) order as before)
+    for j, n2 in enumerate(normalized):
+        matcher.set_seq2(n2)
+        l2 = lengths[j]
+        for i in range(j):
+            n1 = normalized[i]
             
             # Check exact match after normalization
             if n1 == n2:
-                similar_pairs.append((c1, c2, 1.0))
+                found.append((i, j, 1.0))
                 continue
             
             # Check if one contains the other
             if n1 in n2 or n2 in n1:
-                similar_pairs.append((c1, c2, 0.9))
+                found.append((i, j, 0.9))
                 continue
             
-            # Check string similarity
-            ratio = SequenceMatcher(None, n1, n2).ratio()
+            # Check string similarity; the cheap upper bounds skip most pairs.
+            # Length bound first (= real_quick_ratio() without touching the matcher)
+            l1 = lengths[i]
+            if 2.0 * min(l1, l2) / (l1 + l2) < similarity_threshold:
+                continue
+            matcher.set_seq1(n1)
+            if Indel is not None:
+                if Indel.similarity(n1, n2) / (len(n1) + len(n2)) < similarity_threshold:
+                    continue
+            elif matcher.quick_ratio() < similarity_threshold:
+                continue
+            ratio = matcher.ratio()
             if ratio >= similarity_threshold:
-                similar_pairs.append((c1, c2, ratio))
+                found.append((i, j, ratio))
     
-    return sorted(similar_pairs, key=lambda x: x[2], reverse=True)
+    found.sort(key=lambda x: (-x[2], x[0], x[1]))
+    return [(concept_list[i], concept_list[j], ratio) for i, j, ratio in found]
 
 def find_japanese_english_pairs(concepts):
     """Find concepts that have both Japanese and English versions."""
     # Pattern: Japanese (English) or English (Japanese)
     pairs = []
+    # Dict order of every concept: O(1) existence check that also keeps the output order
+    position = {name: i for i, name in enumerate(concepts)}
     for c in concepts.keys():
         # Check if concept has parenthetical notation
-        match = re.match(r'(.+?)\s*[\(（]([^\)）]+)[\)）]', c)
+        match = PAREN_PATTERN.match(c)
         if match:
             main = match.group(1).strip()
             alt = match.group(2).strip()
             # Check if alternate exists as separate concept
-            for other in concepts.keys():
-                if other != c and (other == main or other == alt):
-                    pairs.append((c, other))
+            others = [other for other in {main, alt} if other != c and other in position]
+            others.sort(key=position.__getitem__)
+            pairs.extend((c, other) for other in others)
     return pairs
 
 def main():
@@ -1,21 +1,30 @@
 
-import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
 from datetime import datetime
 
+# JSON helpers shared with the Cloud Function (orjson when installed, stdlib json otherwise)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud_function')))
+from services.json_utils import loads_json
+
 BUCKET_NAME = "my-book-summary-config"
 
+# Parallel metadata.json downloads (the scan is network-latency bound)
+DOWNLOAD_WORKERS = 32
+
 def check_stuck_jobs():
     storage_client = storage.Client()
     bucket = storage_client.bucket(BUCKET_NAME)
     
     print(f"Checking jobs in {BUCKET_NAME}...")
     
-    # List all job directories
-    blobs = list(bucket.list_blobs(prefix="jobs/"))
+    # List all job directories (names only, streamed rather than materialized)
+    blobs = bucket.list_blobs(prefix="jobs/", fields="items(name),nextPageToken")
     
     job_data = {}
+    metadata_blobs = []
     
     for blob in blobs:
         # Expected format: jobs/<job_id>/<filename>
@@ -30,14 +39,22 @@ def check_stuck_jobs():
             job_data[job_id] = {"metadata": None, "has_error": False}
             
         if filename == "metadata.json":
-            try:
-                content = blob.download_as_text()
-                job_data[job_id]["metadata"] = json.loads(content)
-            except Exception as e:
-                print(f"Error reading metadata for {job_id}: {e}")
+            metadata_blobs.append((job_id, blob))
         elif filename == "errors.json":
             job_data[job_id]["has_error"] = True
 
+    def read_metadata(item):
+        job_id, blob = item
+        try:
+            return job_id, loads_json(blob.download_as_bytes())
+        except Exception as e:
+            print(f"Error reading metadata for {job_id}: {e}")
+            return job_id, None
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        for job_id, metadata in executor.map(read_metadata, metadata_blobs):
+            job_data[job_id]["metadata"] = metadata
+
     print("\n--- Incomplete Jobs Report ---")
     stuck_jobs = []
     
@@ -1,28 +1,56 @@
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from google.auth.transport.requests import AuthorizedSession, Request
 import google.auth
-import io
 import os
 
+DRIVE_MEDIA_URL = "https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+
+# The file is fetched as parallel byte ranges (one connection each) written at their offsets
+RANGE_SIZE = 8 * 1024 * 1024
+RANGE_WORKERS = 8
+
+def download_range(creds, url, fd, start, end):
+    """Downloads bytes start..end (inclusive) and writes them at the same offset."""
+    session = AuthorizedSession(creds)
+    with session.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True) as resp:
+        resp.raise_for_status()
+        offset = start
+        for chunk in resp.iter_content(chunk_size=1024 * 1024):
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+    if offset != end + 1:
+        raise IOError(f"Short read for bytes {start}-{end}: got {offset - start} bytes")
+    return end + 1 - start
+
 def download_pdf():
     creds, _ = google.auth.default(scopes=['https://www.googleapis.com/auth/drive.readonly'])
     drive = build('drive', 'v3', credentials=creds)
 
     file_id = '1CKLj8jztwQTc4Tmr-J_mIr-c5Oq944MS'
     dest_path = '/Users/takagishota/Documents/KnowledgeBase/戦略ごっこ_マーケティング以前の問題.pdf'
-    
+
     print(f"Downloading file ID: {file_id} to {dest_path}")
-    
-    request = drive.files().get_media(fileId=file_id)
-
-    with open(dest_path, 'wb') as f:
-        downloader = MediaIoBaseDownload(f, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-            if status:
-                print(f'Progress: {int(status.progress() * 100)}%')
+
+    size = int(drive.files().get(fileId=file_id, fields="size").execute()["size"])
+    ranges = [(start, min(start + RANGE_SIZE, size) - 1) for start in range(0, size, RANGE_SIZE)]
+
+    # Refresh once up front so the worker sessions don't all refresh the token at the same time
+    creds.refresh(Request())
+    url = DRIVE_MEDIA_URL.format(file_id=file_id)
+
+    fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        downloaded = 0
+        with ThreadPoolExecutor(max_workers=RANGE_WORKERS) as executor:
+            futures = [executor.submit(download_range, creds, url, fd, start, end) for start, end in ranges]
+            for future in as_completed(futures):
+                downloaded += future.result()
+                print(f'Progress: {int(downloaded * 100 / size)}%')
+    finally:
+        os.close(fd)
     print('Download complete!')
 
 if __name__ == "__main__":
@@ -1,31 +1,74 @@
 
 import os
-import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
 
+# JSON helpers shared with the Cloud Function (orjson when installed, stdlib json otherwise)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud_function')))
+from services.json_utils import loads_json
+
+# Parallel metadata.json downloads (the scan is network-latency bound)
+DOWNLOAD_WORKERS = 32
+
+def _read_metadata(blob):
+    try:
+        return loads_json(blob.download_as_bytes())
+    except Exception as e:
+        print(f"Error reading {blob.name}: {e}")
+        return None
+
 def find_job(bucket_name, target_file_id):
     client = storage.Client()
     bucket = client.bucket(bucket_name)
     
     print(f"Searching in bucket: {bucket_name}")
     
-    # List all blobs in jobs/ directory
-    blobs = bucket.list_blobs(prefix="jobs/")
+    # List all blobs in jobs/ directory (names only; streamed page by page)
+    blobs = bucket.list_blobs(prefix="jobs/", fields="items(name),nextPageToken")
     
-    for blob in blobs:
-        if blob.name.endswith("metadata.json"):
-            try:
-                content = blob.download_as_text()
-                metadata = json.loads(content)
-                
-                if metadata.get("file_id") == target_file_id:
-                    print(f"FOUND MATCH!")
-                    print(f"Job ID: {metadata.get('job_id')}")
-                    print(f"Created At: {metadata.get('created_at')}")
-                    print(f"Status: {metadata.get('status')}")
-                    return metadata.get('job_id')
-            except Exception as e:
-                print(f"Error reading {blob.name}: {e}")
+    def report(metadata):
+        print(f"FOUND MATCH!")
+        print(f"Job ID: {metadata.get('job_id')}")
+        print(f"Created At: {metadata.get('created_at')}")
+        print(f"Status: {metadata.get('status')}")
+        return metadata.get('job_id')
+    
+    def is_match(metadata):
+        return metadata and metadata.get("file_id") == target_file_id
+    
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        # Futures in listing order; results are checked in that order so the job
+        # reported is the first match in the listing, as in a serial scan
+        futures = []
+        checked = 0
+        
+        def first_match(block):
+            # Checks the next futures in order (only those already done unless block)
+            nonlocal checked
+            while checked < len(futures) and (block or futures[checked].done()):
+                metadata = futures[checked].result()
+                checked += 1
+                if is_match(metadata):
+                    # Stop later downloads that have not started yet
+                    for future in futures[checked:]:
+                        future.cancel()
+                    return metadata
+            return None
+        
+        # Downloads start while later listing pages are still being fetched
+        for page in blobs.pages:
+            for blob in page:
+                if blob.name.endswith("metadata.json"):
+                    futures.append(executor.submit(_read_metadata, blob))
+            
+            metadata = first_match(block=False)
+            if metadata:
+                return report(metadata)
+        
+        metadata = first_match(block=True)
+        if metadata:
+            return report(metadata)
                 
     print("No matching job found.")
     return None
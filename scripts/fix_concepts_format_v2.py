@@ -3,6 +3,7 @@
 Fix Concepts Index Format & Merge Significance Terms
 """
 
+import io
 import re
 import sys
 import shutil
@@ -26,16 +27,24 @@ MERGE_LIST = [
     "有意水準", "有意確率"
 ]
 
+# One index entry in the flattened content: "- [concept] : sources" up to the next "- [" bullet
+ENTRY_PATTERN = re.compile(r'-\s*(\[.*?\])\s*:\s*(.*?)(?=\s-\s*\[|$)')
+WIKILINK_PATTERN = re.compile(r'\[\[(.*?)\]\]')
+
 def clean_wikilink(text):
     """Remove newlines, extra spaces, and outer brackets from a wikilink content."""
     # Matches [[ ... ]] and extracts content
     # But input might be broken like "[ [ \n content \n ] ]"
     
     # 1. Remove all newlines and multiple spaces
-    cleaned = ' '.join(text.split())
+    # (skipped for already-flattened input: no double spaces, no \n/\t/全角スペース etc.)
+    if '  ' not in text and text.isprintable():
+        cleaned = text
+    else:
+        cleaned = ' '.join(text.split())
     
     # 2. Extract content from [[...]]
-    match = re.search(r'\[\[(.*?)\]\]', cleaned)
+    match = WIKILINK_PATTERN.search(cleaned)
     if match:
         return match.group(1).strip()
     
@@ -72,12 +81,10 @@ def parse_and_clean(filepath):
     # Let's iterate through the string using finditer with a very broad pattern
     # - \s* (\[.*?) \s* : \s* (.*?) (?=- \[|$)  <-- lookahead for next entry
     
-    pattern = r'-\s*(\[.*?\])\s*:\s*(.*?)(?=\s-\s*\[|$)'
-    
     # We need to be careful about greedy matching.
     # The key is that "Concept" part usually ends with "]:" (in broken) or "]:" (in clean)
     
-    matches = re.finditer(pattern, normalized)
+    matches = ENTRY_PATTERN.finditer(normalized)
     
     for m in matches:
         raw_concept = m.group(1)
@@ -128,8 +135,6 @@ def merge_significance(concepts):
     return merged
 
 def generate_markdown(concepts):
-    lines = ["# Concepts Index", "", "## Hub Concepts (>=3 sources)", "", "> [!TIP] 定期レビュー対象", "> 以下の概念は複数の書籍/クリップから参照されています。", "> 内容の一貫性や深掘りの必要性を定期的に確認してください。", ""]
-    
     hubs = {}
     standards = {}
     
@@ -138,22 +143,25 @@ def generate_markdown(concepts):
             hubs[c] = s
         else:
             standards[c] = s
+    
+    # Written piece by piece into one buffer (no per-line list / final join copy)
+    buf = io.StringIO()
+    w = buf.write
+    w("# Concepts Index\n\n## Hub Concepts (>=3 sources)\n\n> [!TIP] 定期レビュー対象\n> 以下の概念は複数の書籍/クリップから参照されています。\n> 内容の一貫性や深掘りの必要性を定期的に確認してください。\n")
             
     # Output Hubs
     for c, s in sorted(hubs.items(), key=lambda x: (-len(x[1]), x[0])):
-        link_str = ", ".join([f"[[{src}]]" for src in sorted(s)])
-        lines.append(f"- [[{c}]] ({len(s)}): {link_str}")
+        w(f"\n- [[{c}]] ({len(s)}): ")
+        w(", ".join(map("[[{}]]".format, sorted(s))))
         
-    lines.append("")
-    lines.append("## Standard Concepts")
-    lines.append("")
+    w("\n\n## Standard Concepts\n")
     
     # Output Standards
     for c, s in sorted(standards.items(), key=lambda x: x[0]):
-        link_str = ", ".join([f"[[{src}]]" for src in sorted(s)])
-        lines.append(f"- [[{c}]]: {link_str}")
+        w(f"\n- [[{c}]]: ")
+        w(", ".join(map("[[{}]]".format, sorted(s))))
         
-    return "\n".join(lines)
+    return buf.getvalue()
 
 def main():
     filepath = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('/Users/takagishota/Documents/KnowledgeBase/00_Concepts_Index.md')
@@ -4,6 +4,7 @@ Fix Links in Concepts Index
 Applies specific string replacements to fix broken links identified in validation.
 """
 
+import re
 import sys
 from pathlib import Path
 
@@ -21,6 +22,11 @@ REPLACEMENTS = {
     "[[人文・社会科学のためのカテゴリカル・データ解析入門]]": "[[太郎丸博_人文•社会科学のためのカテゴリカル・データ解析入門]]"
 }
 
+# All replacement keys in one alternation (longest first) so the document is scanned once
+REPLACEMENT_PATTERN = re.compile("|".join(
+    re.escape(old) for old in sorted(REPLACEMENTS, key=len, reverse=True)
+))
+
 def main():
     filepath = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('/Users/takagishota/Documents/KnowledgeBase/00_Concepts_Index.md')
     
@@ -28,13 +34,19 @@ def main():
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    new_content = content
+    found = set()
+    
+    def replace(match):
+        old = match.group(0)
+        found.add(old)
+        return REPLACEMENTS[old]
+    
+    # Single pass applying every replacement
+    new_content = REPLACEMENT_PATTERN.sub(replace, content)
     count = 0
     
-    # Simple string replacement for most
     for old, new in REPLACEMENTS.items():
-        if old in new_content:
-            new_content = new_content.replace(old, new)
+        if old in found:
             print(f"Replaced: {old[:30]}... -> {new[:30]}...")
             count += 1
         else:
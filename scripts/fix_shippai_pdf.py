@@ -5,23 +5,33 @@ PDF処理スクリプト:
 2. 表紙PDFを左90度回転して本紙の先頭に挿入
 """
 
+import functools
 import io
 import os
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
 from google.oauth2 import service_account
 import googleapiclient.discovery
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
-from pypdf import PdfReader, PdfWriter
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+import fitz  # PyMuPDF
+
+# Resumable upload chunk size (the merged PDF is streamed from the local file)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
 
 # Google Drive File IDs
 MAIN_PDF_ID = "16bnbQgys-mq29_4-ae_b37qS0qIKCPLE"  # 本紙（1枚目削除対象）
 COVER_PDF_ID = "1HSyavvq4xJdMNxCqYoJwXdTArECxYH_r"  # 表紙（左90度回転）
 
-def get_drive_service():
-    """Create Google Drive API service"""
+@functools.lru_cache(maxsize=1)
+def get_drive_credentials():
+    """Application default credentials, resolved once and shared by every service instance"""
     from google.auth import default
     credentials, _ = default(scopes=['https://www.googleapis.com/auth/drive'])
-    return googleapiclient.discovery.build('drive', 'v3', credentials=credentials)
+    return credentials
+
+def get_drive_service():
+    """Create Google Drive API service (from the discovery doc bundled with the client library)"""
+    return googleapiclient.discovery.build('drive', 'v3', credentials=get_drive_credentials(), static_discovery=True)
 
 def download_pdf(service, file_id):
     """Download PDF from Google Drive"""
@@ -37,6 +47,10 @@ def download_pdf(service, file_id):
     buffer.seek(0)
     return buffer
 
+def download_pdf_with_own_service(file_id):
+    """Download in a worker thread (httplib2 connections are not thread-safe, so each builds its own service)"""
+    return download_pdf(get_drive_service(), file_id)
+
 def process_pdfs():
     """Main PDF processing function"""
     print("=== PDF処理開始 ===")
@@ -44,54 +58,48 @@ def process_pdfs():
     # Drive API初期化
     service = get_drive_service()
     
-    # 1. PDFダウンロード
-    print("\n1. 本紙PDFをダウンロード中...")
-    main_pdf_buffer = download_pdf(service, MAIN_PDF_ID)
-    main_reader = PdfReader(main_pdf_buffer)
-    print(f"   本紙: {len(main_reader.pages)}ページ")
+    # 1. PDFダウンロード（本紙・表紙を並列に取得）
+    print("\n1-2. 本紙PDF・表紙PDFをダウンロード中...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        main_future = executor.submit(download_pdf_with_own_service, MAIN_PDF_ID)
+        cover_future = executor.submit(download_pdf_with_own_service, COVER_PDF_ID)
+        main_pdf_buffer = main_future.result()
+        cover_pdf_buffer = cover_future.result()
     
-    print("\n2. 表紙PDFをダウンロード中...")
-    cover_pdf_buffer = download_pdf(service, COVER_PDF_ID)
-    cover_reader = PdfReader(cover_pdf_buffer)
-    print(f"   表紙: {len(cover_reader.pages)}ページ")
+    main_doc = fitz.open(stream=main_pdf_buffer.getvalue(), filetype="pdf")
+    print(f"   本紙: {main_doc.page_count}ページ")
+    cover_doc = fitz.open(stream=cover_pdf_buffer.getvalue(), filetype="pdf")
+    print(f"   表紙: {cover_doc.page_count}ページ")
     
-    # 2. 新しいPDFを作成
+    # 2. 新しいPDFを作成（ページのコピーはMuPDF側で行う）
     print("\n3. PDFを結合中...")
-    writer = PdfWriter()
+    writer = fitz.open()
     
-    # 表紙を左90度（反時計回り = -90度 = 270度）回転して追加
-    for page in cover_reader.pages:
-        page.rotate(-90)  # 左90度回転
-        writer.add_page(page)
-    print(f"   表紙 {len(cover_reader.pages)}ページを左90度回転して追加")
+    # 表紙を追加し、コピー先のページを左90度（反時計回り = -90度 = 270度）回転
+    # （insert_pdfのrotate=は絶対値指定なので、元の回転を保つため相対で設定。元PDFは変更しない）
+    writer.insert_pdf(cover_doc)
+    for page in writer.pages(0, cover_doc.page_count):
+        page.set_rotation((page.rotation - 90) % 360)  # 左90度回転
+    print(f"   表紙 {cover_doc.page_count}ページを左90度回転して追加")
     
     # 本紙から1枚目を除いて追加
-    for i, page in enumerate(main_reader.pages):
-        if i == 0:
-            print(f"   本紙1枚目をスキップ")
-            continue
-        writer.add_page(page)
-    print(f"   本紙 {len(main_reader.pages) - 1}ページを追加")
-    
-    # 3. 結果を保存
-    output_buffer = io.BytesIO()
-    writer.write(output_buffer)
-    output_buffer.seek(0)
+    print(f"   本紙1枚目をスキップ")
+    if main_doc.page_count > 1:
+        writer.insert_pdf(main_doc, from_page=1)
+    print(f"   本紙 {main_doc.page_count - 1}ページを追加")
     
-    total_pages = len(cover_reader.pages) + len(main_reader.pages) - 1
+    total_pages = writer.page_count
     print(f"\n4. 完成: 合計 {total_pages}ページ")
     
-    # 4. ローカルに保存（先に実行）
+    # 3. ローカルに保存（先に実行。メモリ上にコピーを作らず直接ファイルへ書き出す）
     local_path = os.path.expanduser("~/Desktop/失敗の本質_結合済み.pdf")
-    with open(local_path, 'wb') as f:
-        f.write(output_buffer.read())
+    writer.save(local_path, garbage=4, deflate=True)
     print(f"\n5. ローカル保存完了: {local_path}")
     
-    # 5. Google Driveにアップロード（オプション）
+    # 4. Google Driveにアップロード（オプション）
     print("\n6. Google Driveにアップロード中...")
     try:
-        output_buffer.seek(0)
-        media = MediaIoBaseUpload(output_buffer, mimetype='application/pdf', resumable=True)
+        media = MediaFileUpload(local_path, mimetype='application/pdf', resumable=True, chunksize=UPLOAD_CHUNK_SIZE)
         updated_file = service.files().update(
             fileId=MAIN_PDF_ID,
             media_body=media
@@ -10,7 +10,7 @@ import traceback
 # Add cloud_function to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 cloud_function_dir = os.path.abspath(os.path.join(current_dir, '../cloud_function'))
-sys.path.append(cloud_function_dir)
+sys.path.insert(0, cloud_function_dir)
 print(f"Added {cloud_function_dir} to sys.path")
 
 try:
@@ -7,12 +7,16 @@ Refactor Concepts Index
 4. Sorts concepts.
 """
 
-import re
+import io
+import os
 import sys
 import shutil
 from collections import defaultdict
 from pathlib import Path
 
+# Index entry / source patterns are shared with analyze_concepts.py (same directory)
+from analyze_concepts import INDEX_ENTRY_PATTERN, INDEX_SOURCE_PATTERN
+
 # Normalization map (Duplicate -> Unified)
 NORMALIZATION_MAP = {
     # 俯瞰
@@ -27,37 +31,24 @@ NORMALIZATION_MAP = {
     "問題解決 (Problem Solving)": "問題解決",
 }
 
+
 def parse_concepts_index(filepath):
     """Parse the concepts index file and extract concept -> sources mapping."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+    # One read + one decode (every separator the patterns use is \s, so \r\n needs no translation)
+    content = Path(filepath).read_bytes().decode('utf-8')
     
     concepts = defaultdict(set)
+    # The same source titles recur across hundreds of entries: intern so they share one object
+    intern = sys.intern
+    
+    # One pass covers both the standard format ([[concept]]: [[source1]], [[source2]])
+    # and the multi-line format ([ [concept ] ]: [ [source ] ]); \s* also matches zero spaces.
+    # Whitespace is collapsed per captured name instead of copying the whole file first.
+    for match in INDEX_ENTRY_PATTERN.finditer(content):
+        concept = intern(' '.join(match.group(1).split()))
+        sources = INDEX_SOURCE_PATTERN.findall(match.group(2))
+        concepts[concept].update(intern(' '.join(src.split())) for src in sources)
     
-    # Normalize the content: join multi-line entries into single lines
-    # Replace newlines with space, then collapse multiple spaces
-    normalized = ' '.join(content.split())
-    
-    # Pattern 1: Standard format - [[concept]]: [[source1]], [[source2]]
-    standard_pattern = r'- \[\[([^\]]+)\]\]\s*:\s*(\[\[[^\]]+\]\](?:\s*,\s*\[\[[^\]]+\]\])*)'
-    
-    for match in re.finditer(standard_pattern, normalized):
-        concept = match.group(1).strip()
-        sources_str = match.group(2)
-        sources = re.findall(r'\[\[([^\]]+)\]\]', sources_str)
-        for src in sources:
-            concepts[concept].add(src.strip())
-    
-    # Pattern 2: Multi-line format - [ [concept ] ]: [ [source ] ], [ [source2 ] ]
-    multiline_pattern = r'- \[\s*\[([^\]]+)\]\s*\]\s*:\s*((?:\[\s*\[([^\]]+)\]\s*\](?:\s*,\s*)?)+)'
-    
-    for match in re.finditer(multiline_pattern, normalized):
-        concept = match.group(1).strip()
-        sources_str = match.group(2)
-        sources = re.findall(r'\[\s*\[([^\]]+)\]\s*\]', sources_str)
-        for src in sources:
-            concepts[concept].add(src.strip())
-            
     return concepts
 
 def normalize_concepts(concepts):
@@ -78,8 +69,6 @@ def normalize_concepts(concepts):
 
 def generate_markdown(concepts, threshold=3):
     """Generate the new Markdown content."""
-    lines = ["# Concepts Index", ""]
-    
     # Identify Hub Concepts
     hubs = {}
     standards = {}
@@ -89,32 +78,33 @@ def generate_markdown(concepts, threshold=3):
             hubs[concept] = sources
         else:
             standards[concept] = sources
-            
+    
+    # Written piece by piece into one buffer (no per-line list / final join copy)
+    buf = io.StringIO()
+    w = buf.write
+    
     # Hub Concepts Section
-    lines.append(f"## Hub Concepts (>={threshold} sources)")
-    lines.append("")
-    lines.append("> [!TIP] 定期レビュー対象")
-    lines.append("> 以下の概念は複数の書籍/クリップから参照されています。")
-    lines.append("> 内容の一貫性や深掘りの必要性を定期的に確認してください。")
-    lines.append("")
+    w("# Concepts Index\n\n")
+    w(f"## Hub Concepts (>={threshold} sources)\n\n")
+    w("> [!TIP] 定期レビュー対象\n")
+    w("> 以下の概念は複数の書籍/クリップから参照されています。\n")
+    w("> 内容の一貫性や深掘りの必要性を定期的に確認してください。\n")
     
     # Sort hubs by count (desc) then name (asc)
     sorted_hubs = sorted(hubs.items(), key=lambda x: (-len(x[1]), x[0]))
     for concept, sources in sorted_hubs:
-        source_links = ", ".join([f"[[{s}]]" for s in sorted(sources)])
-        lines.append(f"- [[{concept}]] ({len(sources)}): {source_links}")
-        
-    lines.append("")
-    lines.append("## Standard Concepts")
-    lines.append("")
+        w(f"\n- [[{concept}]] ({len(sources)}): ")
+        w(", ".join(map("[[{}]]".format, sorted(sources))))
+    
+    w("\n\n## Standard Concepts\n")
     
     # Sort standards by name (asc)
     sorted_standards = sorted(standards.items(), key=lambda x: x[0])
     for concept, sources in sorted_standards:
-        source_links = ", ".join([f"[[{s}]]" for s in sorted(sources)])
-        lines.append(f"- [[{concept}]]: {source_links}")
-        
-    return "\n".join(lines)
+        w(f"\n- [[{concept}]]: ")
+        w(", ".join(map("[[{}]]".format, sorted(sources))))
+    
+    return buf.getvalue()
 
 def main():
     filepath = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('/Users/takagishota/Documents/KnowledgeBase/00_Concepts_Index.md')
@@ -135,8 +125,10 @@ def main():
     
     new_content = generate_markdown(normalized, threshold=3)
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    # Write a sibling temp file and swap it in, so an interrupted run never leaves a truncated index
+    tmp_path = filepath.with_suffix('.md.tmp')
+    tmp_path.write_bytes(new_content.encode('utf-8'))
+    os.replace(tmp_path, filepath)
         
     print(f"Successfully wrote refactored index to {filepath}")
 
@@ -4,7 +4,7 @@ import os
 import re
 
 # Add the cloud_function directory to sys.path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud_function')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud_function')))
 
 try:
     from services.pdf_processor import PdfProcessor
@@ -4,8 +4,8 @@ Reproduction test for Sapiens TOC extraction issue.
 Tests the current Vision AI extraction to identify missing chapters (第2〜4章).
 """
 import os
+import re
 import sys
-import json
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -17,6 +17,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'cloud_function
 from services.pdf_processor import PdfProcessor
 from services.gemini_service import GeminiService
 from services.gcs_service import GcsService
+from services.json_utils import dumps_json
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 
@@ -28,6 +29,9 @@ SAPIENS_EXPECTED_CHAPTERS = [
     "第9章", "第10章", "第11章"          # 第3部
 ]
 
+# "第N章" inside an extracted chapter number
+CHAPTER_NUMBER_PATTERN = re.compile(r'第(\d+)章')
+
 def main():
     print("="*60)
     print("🔍 Sapiens TOC Extraction Reproduction Test")
@@ -79,10 +83,12 @@ def main():
     
     # Check for missing chapters
     print("\n5️⃣ Missing Chapter Analysis:")
-    missing = []
-    for expected in SAPIENS_EXPECTED_CHAPTERS:
-        if not any(expected in num for num in extracted_numbers):
-            missing.append(expected)
+    extracted_labels = {
+        f"第{digits}章"
+        for num in extracted_numbers
+        for digits in CHAPTER_NUMBER_PATTERN.findall(num)
+    }
+    missing = [expected for expected in SAPIENS_EXPECTED_CHAPTERS if expected not in extracted_labels]
     
     if missing:
         print(f"   ❌ Missing chapters: {', '.join(missing)}")
@@ -93,35 +99,40 @@ def main():
     print("\n6️⃣ Chapter Continuity Check:")
     chapter_nums = []
     for num in extracted_numbers:
-        import re
-        m = re.search(r'第(\d+)章', num)
+        m = CHAPTER_NUMBER_PATTERN.search(num)
         if m:
             chapter_nums.append(int(m.group(1)))
     
     if chapter_nums:
-        gaps = []
-        sorted_nums = sorted(chapter_nums)
-        for i in range(len(sorted_nums) - 1):
-            if sorted_nums[i+1] - sorted_nums[i] > 1:
-                gaps.append((sorted_nums[i], sorted_nums[i+1]))
+        # One pass in extraction order (sorting would hide out-of-order and duplicated chapters)
+        issues = []
+        prev = chapter_nums[0]
+        for num in chapter_nums[1:]:
+            if num == prev:
+                issues.append(f"Duplicate 第{num}章")
+            elif num < prev:
+                issues.append(f"Out of order: 第{num}章 after 第{prev}章")
+            elif num > prev + 1:
+                issues.append(f"Gap between 第{prev}章 and 第{num}章")
+            prev = num
         
-        if gaps:
-            print(f"   ❌ Gaps detected:")
-            for start, end in gaps:
-                print(f"      - Gap between 第{start}章 and 第{end}章")
+        if issues:
+            print(f"   ❌ Sequence issues detected:")
+            for issue in issues:
+                print(f"      - {issue}")
         else:
             print(f"   ✅ No gaps in chapter sequence")
     
     # Save result
     output_file = os.path.join(os.path.dirname(__file__), "sapiens_toc_repro_result.json")
-    with open(output_file, "w") as f:
-        json.dump({
+    with open(output_file, "wb") as f:
+        f.write(dumps_json({
             "result": result,
             "extracted_count": len(chapters),
             "expected_count": len(SAPIENS_EXPECTED_CHAPTERS),
             "missing": missing,
             "chapter_numbers": chapter_nums
-        }, f, ensure_ascii=False, indent=2)
+        }, indent=True))
     print(f"\n📁 Result saved to: {output_file}")
     
     print("\n" + "="*60)
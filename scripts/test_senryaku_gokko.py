@@ -1,22 +1,28 @@
 #!/usr/bin/env python3
 """戦略ごっこ TOC抽出問題の再現テスト"""
 import os, sys, json, re
+from functools import lru_cache
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(os.path.join(current_dir, '../cloud_function'))
+sys.path.insert(0, os.path.abspath(os.path.join(current_dir, '../cloud_function')))
 
 from services.pdf_processor import PdfProcessor
 from services.gemini_service import GeminiService
 
 PDF_PATH = "/Users/takagishota/Documents/KnowledgeBase/戦略ごっこ_マーケティング以前の問題.pdf"
 
+@lru_cache(maxsize=1)
+def get_processor():
+    """両テストで共有（開いたPDFとページテキストのキャッシュを再利用）"""
+    return PdfProcessor()
+
 def test_vision_toc():
     """Vision AI TOC抽出テスト"""
     print("\n" + "=" * 60)
     print("Vision AI TOC抽出")
     print("=" * 60)
     
-    processor = PdfProcessor()
+    processor = get_processor()
     gemini = GeminiService()
     # Check if API KEY is set
     if not os.environ.get("GEMINI_API_KEY"):
@@ -33,8 +39,9 @@ def test_vision_toc():
     print(f"✅ {len(chapters)}章検出")
     
     for ch in chapters[:10]:
-        title = f"{ch.get('number', '')} {ch.get('title', '')}"
-        print(f"  [p.{ch.get('content_start_page') if ch.get('content_start_page') else 0:3d}] {title[:60]}")
+        get = ch.get
+        title = f"{get('number', '')} {get('title', '')}"
+        print(f"  [p.{get('content_start_page') or 0:3d}] {title[:60]}")
     
     return toc_data
 
@@ -44,19 +51,19 @@ def test_regex_fallback():
     print("正規表現フォールバック")
     print("=" * 60)
     
-    processor = PdfProcessor()
+    processor = get_processor()
     text = processor.extract_text_from_pdf_file(PDF_PATH)
     chapters = processor.split_into_chapters(text)
     
     print(f"✅ {len(chapters)}章検出")
     
     problems = []
-    for ch in chapters:
+    for i, ch in enumerate(chapters):
         title = ch.get("title", "")
         title_len = len(title)
         status = "⚠️" if title_len > 80 else "✅"
         # Only print first 10
-        if chapters.index(ch) < 10:
+        if i < 10:
             print(f"  {status} Len:{title_len:3d} | {title[:60]}...")
         
         if title_len > 80:
@@ -4,14 +4,33 @@ Test the improved TOC extraction by triggering reprocessing for problem books.
 Monitors the job progress and reports results.
 """
 import os
+import sys
 import json
 import time
 import urllib.request
 import urllib.error
+from google.cloud import storage
+from google.cloud.exceptions import NotFound
+
+# JSON helpers shared with the Cloud Function (orjson when installed, stdlib json otherwise)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud_function')))
+from services.json_utils import dumps_json
 
 # Production Cloud Run URL
 FUNCTION_URL = "https://process-book-1037870388124.asia-northeast1.run.app"
 
+# Job files are read with one storage client per run (no gsutil process per poll)
+BUCKET_NAME = "my-book-summary-config"
+_bucket = None
+
+# Status polling: first check after 5s, interval doubles up to 60s
+POLL_INITIAL_SECONDS = 5
+POLL_MAX_SECONDS = 60
+
+# Final states written to jobs/{id}/status.json by JobTracker
+# (metadata.json keeps its initial "processing" status for the whole job)
+TERMINAL_STATUSES = ("completed", "failed")
+
 # Problem books from the analysis
 TEST_CASES = [
     {
@@ -64,36 +83,74 @@ def trigger_processing(test_case: dict) -> str:
         print(f"❌ Error: {e}")
         return None
 
+def get_bucket():
+    """Shared GCS bucket handle."""
+    global _bucket
+    if _bucket is None:
+        _bucket = storage.Client().bucket(BUCKET_NAME)
+    return _bucket
+
+def read_job_file(job_id: str, filename: str) -> dict:
+    """Reads jobs/{job_id}/{filename} as JSON (raises NotFound if missing)."""
+    return json.loads(get_bucket().blob(f"jobs/{job_id}/{filename}").download_as_bytes())
+
 def check_job_status(job_id: str) -> dict:
-    """Check job status from GCS metadata (requires gsutil)."""
-    import subprocess
-    
+    """Check job status from GCS metadata."""
     try:
-        result = subprocess.run(
-            ["gsutil", "cat", f"gs://my-book-summary-config/jobs/{job_id}/metadata.json"],
-            capture_output=True, text=True, timeout=30
-        )
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        return {"status": "unknown", "error": result.stderr}
+        return read_job_file(job_id, "metadata.json")
+    except NotFound as e:
+        return {"status": "unknown", "error": str(e)}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 def check_toc_errors(job_id: str) -> dict:
     """Check TOC extraction errors from GCS."""
-    import subprocess
-    
     try:
-        result = subprocess.run(
-            ["gsutil", "cat", f"gs://my-book-summary-config/jobs/{job_id}/errors.json"],
-            capture_output=True, text=True, timeout=30
-        )
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        return {}
+        return read_job_file(job_id, "errors.json")
     except:
         return {}
 
+def wait_for_job(job_id: str, max_wait: int) -> dict:
+    """
+    Waits until status.json reaches a terminal status (or max_wait seconds pass).
+    Each check is a metadata-only GET; the JSON is downloaded only when the
+    object generation changes, i.e. when the tracker wrote a new status.
+    """
+    blob_name = f"jobs/{job_id}/status.json"
+    job_status = {}
+    generation = None
+    elapsed = 0
+    interval = POLL_INITIAL_SECONDS
+    
+    while elapsed < max_wait:
+        time.sleep(interval)
+        elapsed += interval
+        
+        blob = get_bucket().get_blob(blob_name)
+        if blob is None or blob.generation == generation:
+            # Nothing new yet: back off
+            interval = min(interval * 2, POLL_MAX_SECONDS)
+            continue
+        
+        generation = blob.generation
+        interval = POLL_INITIAL_SECONDS
+        try:
+            job_status = json.loads(blob.download_as_bytes(if_generation_match=generation))
+        except Exception as e:
+            # Overwritten between the two requests; pick it up on the next check
+            print(f"   Status read failed ({e}), retrying")
+            generation = None
+            continue
+        
+        details = job_status.get("details", {})
+        print(f"   [{elapsed//60}m{elapsed%60}s] Status: {job_status.get('status')}, "
+              f"Stage: {details.get('stage', '-')}, Progress: {details.get('progress', '-')}")
+        
+        if job_status.get("status") in TERMINAL_STATUSES:
+            break
+    
+    return job_status
+
 def run_test(test_case: dict):
     """Run test for a single book."""
     # Trigger processing
@@ -102,24 +159,11 @@ def run_test(test_case: dict):
         return {"success": False, "error": "Failed to submit job"}
     
     # Wait for processing to complete (or timeout)
-    print(f"\n⏳ Waiting for processing... (checking every 30s)")
+    print(f"\n⏳ Waiting for processing... (checking after {POLL_INITIAL_SECONDS}s, backing off to {POLL_MAX_SECONDS}s)")
     max_wait = 600  # 10 minutes
-    elapsed = 0
-    
-    while elapsed < max_wait:
-        time.sleep(30)
-        elapsed += 30
-        
-        status = check_job_status(job_id)
-        current_status = status.get("status", "unknown")
-        total_chapters = status.get("total_chapters", "?")
-        completed = len(status.get("completed_chapters", []))
-        
-        print(f"   [{elapsed//60}m{elapsed%60}s] Status: {current_status}, "
-              f"Chapters: {completed}/{total_chapters}")
-        
-        if current_status in ["complete", "failed"]:
-            break
+    job_status = wait_for_job(job_id, max_wait)
+    if job_status.get("status") not in TERMINAL_STATUSES:
+        print(f"   ⚠️ No terminal status after {max_wait}s")
     
     # Report results
     final_status = check_job_status(job_id)
@@ -165,8 +209,8 @@ def main():
         results.append(result)
         
         # Save progress
-        with open("/tmp/toc_test_results_v2.json", "w") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        with open("/tmp/toc_test_results_v2.json", "wb") as f:
+            f.write(dumps_json(results, indent=True))
     
     # Summary
     print("\n" + "="*60)
@@ -3,7 +3,7 @@
 import os, sys, json
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(os.path.join(current_dir, '../cloud_function'))
+sys.path.insert(0, os.path.abspath(os.path.join(current_dir, '../cloud_function')))
 
 from services.pdf_processor import PdfProcessor
 from services.gemini_service import GeminiService
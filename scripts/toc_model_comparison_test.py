@@ -18,20 +18,53 @@ import json
 import time
 import re
 import ssl
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
-import pypdf
+import fitz  # PyMuPDF
 import google.generativeai as genai
 
+# Retry timing and JSON helpers shared with the Cloud Function
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud_function')))
+from services.gemini_service import backoff_seconds, retry_after_seconds
+from services.json_utils import dumps_json
+
 # Configuration
 PDF_PATH = "/Users/takagishota/Documents/KnowledgeBase/ナシーム・ニコラス・タレブ_反脆弱性_上.pdf"
 TOC_MODEL = "gemini-2.0-flash-exp"  # 目次抽出用
 SUMMARY_MODEL = "gemini-2.5-flash"  # 要約用（精度維持）
+TEMPERATURE = 0.2
 
 # Pages to scan for TOC (usually first 15-25 pages)
 TOC_SCAN_PAGES = 25
 
+# Pages after the TOC scan range read while the TOC request runs
+# (chapters 1-3, the summarization test range, usually start within them)
+PREFETCH_PAGES = 120
+
+# Chapters summarized concurrently (kept small so the requests stay within the RPM quota;
+# 429s are handled by the retry loop)
+SUMMARY_WORKERS = 3
+
+# Markdown code fence around a JSON response (compiled once, applied on every response)
+JSON_FENCE_OPEN = re.compile(r"^```json\s*")
+FENCE_OPEN = re.compile(r"^```\s*")
+FENCE_CLOSE = re.compile(r"\s*```$")
+
+# Exact-match response cache: reruns with the same model/prompt/config skip the API call.
+# Stored outside the working tree (override with LLM_CACHE_PATH); disable with LLM_CACHE_ENABLED=false.
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "toc_model_comparison", "llm_cache.json"),
+)
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
 
 def setup_gemini():
     """Initialize Gemini API."""
@@ -44,6 +77,61 @@ def setup_gemini():
     print("✅ Gemini API configured")
 
 
+def write_json_atomic(path: str, obj: Any, indent: bool = True):
+    """
+    Writes obj as UTF-8 JSON (non-ASCII kept as-is) to a .tmp sibling and swaps it in,
+    so an interrupted run never leaves a half-written file.
+    """
+    data = dumps_json(obj, indent=indent)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def llm_cache_key(model_name: str, prompt: str, max_output_tokens: int) -> str:
+    """sha256 over everything that determines the response (model, prompt, generation config)."""
+    payload = json.dumps({
+        "model": model_name,
+        "prompt": prompt,
+        "temperature": TEMPERATURE,
+        "max_output_tokens": max_output_tokens,
+        "response_mime_type": "application/json"
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_llm_cache() -> Dict[str, str]:
+    """Loads the response cache once per run (cache key -> JSON response text)."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            try:
+                with open(LLM_CACHE_PATH, encoding="utf-8") as f:
+                    _llm_cache = json.load(f)
+            except (OSError, ValueError):
+                _llm_cache = {}
+        return _llm_cache
+
+
+def save_llm_cache(cache_key: str, response_text: str):
+    """Adds one response and rewrites the cache file atomically (failures only warn)."""
+    cache = load_llm_cache()
+    with _llm_cache_lock:
+        cache[cache_key] = response_text
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(LLM_CACHE_PATH)), exist_ok=True)
+            write_json_atomic(LLM_CACHE_PATH, cache, indent=False)
+        except OSError as e:
+            print(f"  ⚠️ Failed to write LLM cache: {e}")
+
+
+@lru_cache(maxsize=None)
+def get_model(model_name: str) -> "genai.GenerativeModel":
+    """One GenerativeModel per model name, reused by every call and summary thread."""
+    return genai.GenerativeModel(model_name)
+
+
 def call_gemini_with_retry(
     model_name: str,
     prompt: str,
@@ -54,14 +142,21 @@ def call_gemini_with_retry(
     Call Gemini with retry logic including SSL error handling.
     Based on existing GeminiService implementation.
     """
-    model = genai.GenerativeModel(model_name)
+    cache_key = llm_cache_key(model_name, prompt, max_output_tokens) if LLM_CACHE_ENABLED else None
+    if cache_key:
+        cached_text = load_llm_cache().get(cache_key)
+        if cached_text is not None:
+            print(f"  💾 Cache hit ({model_name})")
+            return json.loads(cached_text)
+    
+    model = get_model(model_name)
     
     for attempt in range(max_retries):
         try:
             response = model.generate_content(
                 prompt,
                 generation_config=genai.GenerationConfig(
-                    temperature=0.2,
+                    temperature=TEMPERATURE,
                     max_output_tokens=max_output_tokens,
                     response_mime_type="application/json"
                 )
@@ -69,60 +164,87 @@ def call_gemini_with_retry(
             
             cleaned_text = response.text.strip()
             if cleaned_text.startswith("```"):
-                cleaned_text = re.sub(r"^```json\s*", "", cleaned_text)
-                cleaned_text = re.sub(r"^```\s*", "", cleaned_text)
-                cleaned_text = re.sub(r"\s*```$", "", cleaned_text)
+                cleaned_text = JSON_FENCE_OPEN.sub("", cleaned_text)
+                cleaned_text = FENCE_OPEN.sub("", cleaned_text)
+                cleaned_text = FENCE_CLOSE.sub("", cleaned_text)
             
-            return json.loads(cleaned_text)
+            result = json.loads(cleaned_text)
+            if cache_key:
+                # The text is cached, so every hit returns a fresh object the caller may modify
+                save_llm_cache(cache_key, cleaned_text)
+            return result
             
         except json.JSONDecodeError as e:
+            # Malformed output is not load related: retry quickly
             print(f"  ⚠️ JSON error (attempt {attempt+1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
-                print(f"  ⏳ Retrying in 5s...")
-                time.sleep(5)
+                wait_time = backoff_seconds(attempt, base=1, cap=8)
+                print(f"  ⏳ Retrying in {wait_time:.1f}s...")
+                time.sleep(wait_time)
             continue
             
         except (ssl.SSLError, ConnectionError, OSError) as e:
-            wait_time = 10 * (attempt + 1)
             print(f"  ⚠️ Connection error (attempt {attempt+1}/{max_retries}): {e}")
-            print(f"  ⏳ Waiting {wait_time}s before retry...")
             if attempt < max_retries - 1:
+                wait_time = backoff_seconds(attempt, base=5)
+                print(f"  ⏳ Waiting {wait_time:.1f}s before retry...")
                 time.sleep(wait_time)
             continue
             
         except Exception as e:
             error_str = str(e)
             print(f"  ⚠️ API error (attempt {attempt+1}/{max_retries}): {e}")
+            if attempt == max_retries - 1:
+                continue
             
             if "ssl" in error_str.lower() or "eof" in error_str.lower() or "connection" in error_str.lower():
-                wait_time = 10 * (attempt + 1)
-                print(f"  ⏳ Connection issue - waiting {wait_time}s...")
-                if attempt < max_retries - 1:
-                    time.sleep(wait_time)
+                wait_time = backoff_seconds(attempt, base=5)
+                print(f"  ⏳ Connection issue - waiting {wait_time:.1f}s...")
             elif "429" in error_str or "quota" in error_str.lower():
-                print("  ⏳ Rate limit - waiting 60s...")
-                time.sleep(60)
-            elif attempt < max_retries - 1:
-                time.sleep(5)
+                # Prefer the delay the API asks for; otherwise back off longer than for other errors
+                wait_time = retry_after_seconds(e) or backoff_seconds(attempt, base=15, cap=120)
+                print(f"  ⏳ Rate limit - waiting {wait_time:.1f}s...")
+            else:
+                wait_time = backoff_seconds(attempt, base=2)
+            time.sleep(wait_time)
             continue
     
     return None
 
 
-def extract_text_from_pages(pdf_path: str, start_page: int = 0, end_page: Optional[int] = None) -> str:
-    """Extract text from specific page range."""
-    reader = pypdf.PdfReader(pdf_path)
-    total_pages = len(reader.pages)
+def read_page_texts(doc: "fitz.Document", start_page: int, end_page: int) -> Dict[int, str]:
+    """Raw text of pages [start_page, end_page) by page index; failing pages are left out."""
+    page_texts = {}
+    for i in range(start_page, min(end_page, doc.page_count)):
+        try:
+            page_texts[i] = doc[i].get_text()
+        except Exception:
+            pass  # re-read (and reported) by extract_text_from_pages
+    return page_texts
+
+
+def extract_text_from_pages(
+    doc: "fitz.Document",
+    start_page: int = 0,
+    end_page: Optional[int] = None,
+    page_texts: Optional[Dict[int, str]] = None
+) -> str:
+    """
+    Extract text from specific page range (PyMuPDF, same extractor as the Cloud Function).
+    Pages found in page_texts (see read_page_texts) are not read again.
+    """
+    total_pages = doc.page_count
     
     if end_page is None:
         end_page = total_pages
     
     end_page = min(end_page, total_pages)
+    page_texts = page_texts or {}
     
     text_parts = []
     for i in range(start_page, end_page):
         try:
-            page_text = reader.pages[i].extract_text()
+            page_text = page_texts[i] if i in page_texts else doc[i].get_text()
             if page_text:
                 text_parts.append(f"--- Page {i+1} ---\n{page_text}")
         except Exception as e:
@@ -196,22 +318,20 @@ def extract_toc_for_current_volume(toc_text: str, total_pages: int, pdf_filename
             "error": "TOC extraction failed after retries"
         }
     
-    # Post-process: Calculate end pages
+    # Post-process in one pass: calculate end pages and filter out any chapters with
+    # pages exceeding total (end pages still come from the unfiltered neighbour)
     chapters = result.get("chapters_in_this_volume", [])
-    for i, ch in enumerate(chapters):
-        if i + 1 < len(chapters):
-            next_start = chapters[i + 1].get("content_start_page")
-            if next_start and ch.get("content_start_page"):
-                ch["content_end_page"] = next_start - 1
-        else:
-            # Last chapter ends at total_pages or earlier
-            if ch.get("content_start_page"):
-                ch["content_end_page"] = total_pages
+    starts = [ch.get("content_start_page") for ch in chapters]
+    # Last chapter ends at total_pages
+    starts.append(total_pages + 1)
     
-    # Additional validation: filter out any chapters with pages exceeding total
     valid_chapters = []
-    for ch in chapters:
-        start = ch.get("content_start_page")
+    for i, ch in enumerate(chapters):
+        start = starts[i]
+        next_start = starts[i + 1]
+        if start and next_start:
+            ch["content_end_page"] = next_start - 1
+        
         if start and start <= total_pages:
             valid_chapters.append(ch)
         else:
@@ -292,16 +412,25 @@ def run_comparison_test():
         print(f"❌ Error: PDF not found at {PDF_PATH}")
         sys.exit(1)
     
+    # Opened once: TOC and chapter text extraction share the parsed document
+    doc = fitz.open(PDF_PATH)
+    try:
+        run_comparison_test_with_doc(doc)
+    finally:
+        doc.close()
+
+
+def run_comparison_test_with_doc(doc: "fitz.Document"):
+    """Runs the TOC extraction and summarization steps on the opened PDF."""
     # Get total pages
-    reader = pypdf.PdfReader(PDF_PATH)
-    total_pages = len(reader.pages)
+    total_pages = doc.page_count
     pdf_filename = os.path.basename(PDF_PATH)
     print(f"📄 Total pages in PDF: {total_pages}")
     print(f"📁 Filename: {pdf_filename}")
     
     # Extract TOC pages
     print(f"\n📖 Extracting first {TOC_SCAN_PAGES} pages for TOC analysis...")
-    toc_text = extract_text_from_pages(PDF_PATH, 0, TOC_SCAN_PAGES)
+    toc_text = extract_text_from_pages(doc, 0, TOC_SCAN_PAGES)
     print(f"   Extracted {len(toc_text)} characters")
     
     # Extract TOC with volume awareness
@@ -310,9 +439,17 @@ def run_comparison_test():
     print(f"   (Volume-aware: filtering chapters beyond {total_pages} pages)")
     print("-"*60)
     
-    start_time = time.time()
-    toc_result = extract_toc_for_current_volume(toc_text, total_pages, pdf_filename)
-    elapsed = time.time() - start_time
+    def timed_toc_extraction():
+        start_time = time.time()
+        toc_result = extract_toc_for_current_volume(toc_text, total_pages, pdf_filename)
+        return toc_result, time.time() - start_time
+    
+    with ThreadPoolExecutor(max_workers=1) as toc_executor:
+        toc_future = toc_executor.submit(timed_toc_extraction)
+        # While the TOC request is in flight, read the pages the first chapters usually span
+        # (the Document stays on this thread; the worker only waits on Gemini)
+        prefetched_pages = read_page_texts(doc, TOC_SCAN_PAGES, TOC_SCAN_PAGES + PREFETCH_PAGES)
+        toc_result, elapsed = toc_future.result()
     
     toc_result["_meta"] = {
         "model": TOC_MODEL,
@@ -356,8 +493,7 @@ def run_comparison_test():
     # Save TOC result
     output_dir = os.path.dirname(os.path.abspath(__file__))
     toc_output_path = os.path.join(output_dir, "toc_comparison_result_v3.json")
-    with open(toc_output_path, "w", encoding="utf-8") as f:
-        json.dump(toc_result, f, ensure_ascii=False, indent=2)
+    write_json_atomic(toc_output_path, toc_result)
     print(f"\n💾 TOC result saved to: {toc_output_path}")
     
     # Filter only "chapter" type entries (not "part")
@@ -376,27 +512,7 @@ def run_comparison_test():
     summary_results = []
     test_chapters = actual_chapters[:3]  # First 3 chapters
     
-    for ch in test_chapters:
-        chapter_number = ch.get("number", "?")
-        chapter_title = ch.get("title", "Untitled")
-        start_page = ch.get("content_start_page")
-        end_page = ch.get("content_end_page")
-        
-        if start_page is None:
-            print(f"\n⚠️  Skipping {chapter_number}: no page number")
-            continue
-        
-        # Ensure end_page is valid
-        if end_page is None or end_page > total_pages:
-            end_page = min(start_page + 30, total_pages)
-        
-        print(f"\n▶ Summarizing: {chapter_number} {chapter_title}")
-        print(f"  Content Pages: {start_page} - {end_page}")
-        
-        # Extract chapter text (0-indexed in pypdf)
-        chapter_text = extract_text_from_pages(PDF_PATH, start_page - 1, end_page)
-        print(f"  Extracted: {len(chapter_text)} characters")
-        
+    def run_summary_job(chapter_number, chapter_title, start_page, end_page, chapter_text):
         # Summarize with retry
         start_time = time.time()
         summary = summarize_chapter(
@@ -413,25 +529,55 @@ def run_comparison_test():
             "pages": f"{start_page}-{end_page}",
             "chars": len(chapter_text)
         }
-        summary_results.append(summary)
-        
-        print(f"  ⏱  Time: {elapsed:.1f}s")
-        print(f"  📋 Key Concepts: {summary.get('keyConcepts', [])[:5]}")
+        return summary
+    
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as executor:
+        # Each chapter's Gemini call starts as soon as its text is extracted, so the calls
+        # overlap with extracting the following chapters (text extraction stays on this thread)
+        summary_futures = []
+        for ch in test_chapters:
+            chapter_number = ch.get("number", "?")
+            chapter_title = ch.get("title", "Untitled")
+            start_page = ch.get("content_start_page")
+            end_page = ch.get("content_end_page")
+            
+            if start_page is None:
+                print(f"\n⚠️  Skipping {chapter_number}: no page number")
+                continue
+            
+            # Ensure end_page is valid
+            if end_page is None or end_page > total_pages:
+                end_page = min(start_page + 30, total_pages)
+            
+            print(f"\n▶ Summarizing: {chapter_number} {chapter_title}")
+            print(f"  Content Pages: {start_page} - {end_page}")
+            
+            # Extract chapter text (0-indexed in PyMuPDF)
+            chapter_text = extract_text_from_pages(doc, start_page - 1, end_page, prefetched_pages)
+            print(f"  Extracted: {len(chapter_text)} characters")
+            
+            future = executor.submit(run_summary_job, chapter_number, chapter_title, start_page, end_page, chapter_text)
+            summary_futures.append((chapter_number, chapter_title, future))
         
-        # Rate limit protection
-        print("  ⏳ Waiting 5s for rate limit...")
-        time.sleep(5)
+        print(f"\n⏳ Waiting for {len(summary_futures)} summaries ({SUMMARY_WORKERS} in parallel)...")
+        # Collected in chapter order
+        for chapter_number, chapter_title, future in summary_futures:
+            summary = future.result()
+            summary_results.append(summary)
+            
+            print(f"\n✔ {chapter_number} {chapter_title}")
+            print(f"  ⏱  Time: {summary['_meta']['elapsed_seconds']:.1f}s")
+            print(f"  📋 Key Concepts: {summary.get('keyConcepts', [])[:5]}")
     
     # Save summary results
     summary_output_path = os.path.join(output_dir, "summary_test_result_v3.json")
-    with open(summary_output_path, "w", encoding="utf-8") as f:
-        json.dump({
-            "toc_model": TOC_MODEL,
-            "summary_model": SUMMARY_MODEL,
-            "volume_info": toc_result.get("volume_info"),
-            "chapters_summarized": len(summary_results),
-            "summaries": summary_results
-        }, f, ensure_ascii=False, indent=2)
+    write_json_atomic(summary_output_path, {
+        "toc_model": TOC_MODEL,
+        "summary_model": SUMMARY_MODEL,
+        "volume_info": toc_result.get("volume_info"),
+        "chapters_summarized": len(summary_results),
+        "summaries": summary_results
+    })
     print(f"\n💾 Summary results saved to: {summary_output_path}")
     
     # Final summary
@@ -1,7 +1,12 @@
 import os
-import json
-import urllib.request
-import urllib.error
+import sys
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# JSON helpers shared with the Cloud Function (orjson when installed, stdlib json otherwise)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud_function')))
+from services.json_utils import dumps_json, loads_json
 
 # Config
 FUNCTION_URL = "https://process-book-1037870388124.asia-northeast1.run.app"
@@ -9,6 +14,23 @@ FUNCTION_URL = "https://process-book-1037870388124.asia-northeast1.run.app"
 TARGET_FILE_ID = "1CKLj8jztwQTc4Tmr-J_mIr-c5Oq944MS" # 戦略ごっこ マーケティング以前の問題
 CATEGORY = "Humanities/Business"
 
+# Cold starts / rate limits are retried with backoff (0.5s, 1s, 2s, ...).
+# POST is not idempotent (a retry after process_book enqueued the job starts a second job),
+# so only failures where the request never reached the handler are retried:
+# connection errors, and 429/503 returned by the Cloud Run frontend. Read errors are not.
+RETRY = Retry(
+    total=5,
+    read=0,
+    backoff_factor=0.5,
+    status_forcelist=(429, 503),
+    allowed_methods=("POST",),
+    raise_on_status=False,
+)
+
+# One keep-alive session per process: repeated triggers (and retries) reuse the TCP/TLS connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=RETRY))
+
 def trigger_processing():
     print(f"Triggering processing for File ID: {TARGET_FILE_ID}...")
     print(f"Target URL: {FUNCTION_URL}")
@@ -18,24 +40,23 @@ def trigger_processing():
         "category": CATEGORY
     }
     
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(
-        FUNCTION_URL, 
-        data=data, 
-        headers={'Content-Type': 'application/json'}
-    )
-    
     try:
-        with urllib.request.urlopen(req) as response:
-            result = json.loads(response.read().decode('utf-8'))
-            print("\nSuccess! Response:")
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-            print(f"\nJob ID: {result.get('job_id')}")
-            print("Check Cloud Tasks console or GCS logs for progress.")
+        response = _SESSION.post(
+            FUNCTION_URL,
+            data=dumps_json(payload),
+            headers={'Content-Type': 'application/json'},
+            timeout=30
+        )
+        response.raise_for_status()
+        result = loads_json(response.content)
+        print("\nSuccess! Response:")
+        print(dumps_json(result, indent=True).decode('utf-8'))
+        print(f"\nJob ID: {result.get('job_id')}")
+        print("Check Cloud Tasks console or GCS logs for progress.")
             
-    except urllib.error.HTTPError as e:
-        print(f"\nError: HTTP {e.code}")
-        print(e.read().decode('utf-8'))
+    except requests.HTTPError as e:
+        print(f"\nError: HTTP {e.response.status_code}")
+        print(e.response.text)
     except Exception as e:
         print(f"\nError: {e}")
 
@@ -2,98 +2,228 @@
 """
 Validate Links in Concepts Index
 Checks if wikilinks in 00_Concepts_Index.md point to existing files in GCS.
+
+Reports every link that has no matching .md file in the bucket.
+
+Usage: validate_links.py [INDEX_PATH] [--refresh] [--profile]
+  INDEX_PATH  Concepts index to check (default: the local vault's 00_Concepts_Index.md)
+  --refresh   Ignore the local bucket listing cache (~/.cache/validate_links, 10 min TTL)
+  --profile   Print the top 20 functions by cumulative time after the run
 """
 
+import heapq
 import re
 import sys
 import os
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from google.cloud import storage
 from collections import defaultdict
 
 # Bucket Name (from config/environment)
 BUCKET_NAME = "obsidian_vault_sync_my_knowledge"
 
-def get_gcs_files(bucket_name):
-    """Get a set of all Markdown files in the bucket (basename only for wikilink matching)."""
+# Top-level folders listed concurrently (the listing is network-latency bound)
+LIST_WORKERS = 16
+
+# Listing response fields (partial response): blob names and the paging token only
+LIST_FIELDS = "items(name),nextPageToken"
+TOP_LEVEL_FIELDS = "items(name),prefixes,nextPageToken"
+
+# Local copy of the listed basenames (one per line), reused by re-runs within the TTL.
+# Pass --refresh to list the bucket again.
+LISTING_CACHE_DIR = os.path.expanduser("~/.cache/validate_links")
+LISTING_CACHE_TTL_SECONDS = 600
+
+# Small indexes are checked with direct lookups of <folder>/<link>.md instead of listing
+# the whole bucket, as long as that stays within this many requests
+MAX_TARGETED_LOOKUPS = 500
+
+# Broken links printed in the report (the first ones in sort order; the rest are counted)
+MAX_REPORTED_LINKS = 50
+
+# Sources part of an index line: the rest of a "- [[" line after its first colon
+INDEX_SOURCES_PATTERN = re.compile(r'^- \[\[[^:\n]*:(.*)$', re.MULTILINE)
+# [[Source]] wikilink in the sources part of an index line
+WIKILINK_PATTERN = re.compile(r'\[\[([^\]]+)\]\]')
+
+@lru_cache(maxsize=1)
+def get_storage_client():
+    """One storage client per run: lookups and listings share its connection pool."""
+    return storage.Client()
+
+def markdown_basenames(blobs):
+    """Basenames without extension of the Markdown blobs in a listing."""
+    # Extract basename without extension for wikilink matching
+    # e.g. "01_Reading/Book.md" -> "Book"
+    # NFC + interned: names synced from macOS may be NFD, while the index is written in NFC
+    return [
+        sys.intern(unicodedata.normalize('NFC', os.path.splitext(os.path.basename(blob.name))[0]))
+        for blob in blobs if blob.name.endswith('.md')
+    ]
+
+def iter_gcs_files(bucket_name):
+    """
+    Yields the basenames of all Markdown files in the bucket as the listing progresses
+    (root first, then each top-level folder as soon as its listing completes).
+    """
     print(f"Connecting to GCS bucket: {bucket_name}...")
+    bucket = get_storage_client().bucket(bucket_name)
+    
+    # Top level first: files at the root, plus the folder prefixes to list in parallel
+    # Only names (and folder prefixes) are transferred, not the full object metadata
+    top_level = bucket.list_blobs(delimiter='/', fields=TOP_LEVEL_FIELDS)
+    yield from markdown_basenames(top_level)
+    prefixes = sorted(top_level.prefixes)  # filled in once the listing has been consumed
+    
+    executor = ThreadPoolExecutor(max_workers=LIST_WORKERS)
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blobs = bucket.list_blobs()
+        futures = [executor.submit(lambda prefix: markdown_basenames(bucket.list_blobs(prefix=prefix, fields=LIST_FIELDS)), prefix) for prefix in prefixes]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        # The caller may stop early: folders not started yet are not listed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def find_linked_files(bucket_name, links):
+    """
+    Links that exist as <link>.md at the bucket root or directly under a top-level folder.
+    Returns None when that would take more than MAX_TARGETED_LOOKUPS lookups (or GCS fails).
+    Links in deeper folders are not found here; the caller confirms the rest with a listing.
+    """
+    try:
+        bucket = get_storage_client().bucket(bucket_name)
+        top_level = bucket.list_blobs(delimiter='/', fields=TOP_LEVEL_FIELDS)
+        root_names = set(markdown_basenames(top_level))
+        prefixes = sorted(top_level.prefixes)
+        
+        # Basenames never contain '/', so such links can only be resolved by the listing
+        candidates = [link for link in links if link not in root_names and '/' not in link]
+        if len(candidates) * len(prefixes) > MAX_TARGETED_LOOKUPS:
+            return None
         
-        files = set()
-        count = 0
-        for blob in blobs:
-            if blob.name.endswith('.md'):
-                # Extract basename without extension for wikilink matching
-                # e.g. "01_Reading/Book.md" -> "Book"
-                basename = os.path.splitext(os.path.basename(blob.name))[0]
-                files.add(basename)
-                count += 1
+        def exists_in_folder(link):
+            return any(bucket.blob(f"{prefix}{link}.md").exists() for prefix in prefixes)
         
-        print(f"Found {count} Markdown files in GCS.")
-        return files
+        with ThreadPoolExecutor(max_workers=LIST_WORKERS) as executor:
+            found = {link for link, exists in zip(candidates, executor.map(exists_in_folder, candidates)) if exists}
+        return (links & root_names) | found
     except Exception as e:
-        print(f"Error accessing GCS: {e}")
-        return set()
+        print(f"Direct lookup failed, falling back to listing: {e}")
+        return None
+
+def load_cached_files(cache_path, ttl_seconds):
+    """Cached basenames, or None when the cache is missing or older than ttl_seconds."""
+    try:
+        if time.time() - os.path.getmtime(cache_path) > ttl_seconds:
+            return None
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return frozenset(map(sys.intern, f.read().splitlines()))
+    except OSError:
+        return None
+
+def save_cached_files(cache_path, files):
+    """Writes the basenames to cache_path (temp file + rename; failures only warn)."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(sorted(files)))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: failed to write listing cache: {e}")
 
 def parse_concepts_index(filepath):
     """Extract all source links from the index."""
     with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+        content = unicodedata.normalize('NFC', f.read())
     
-    links = set()
-    
-    # Pattern to find [[Source]] in the values part
-    # Line format: - [[Concept]]: [[Source1]], [[Source2]] ...
-    for line in content.split('\n'):
-        if not line.startswith('- [['):
-            continue
-        
-        # Extract the part after the colon
-        parts = line.split(':', 1)
-        if len(parts) < 2:
-            continue
-            
-        sources_str = parts[1]
-        matches = re.findall(r'\[\[([^\]]+)\]\]', sources_str)
-        for m in matches:
-            links.add(m.strip())
-            
-    return links
+    # One pass over the whole file instead of a Python-level loop per line.
+    # Line format: - [[Concept]]: [[Source1]], [[Source2]] ... (hubs: - [[Concept]] (N): ...)
+    # The sources part is everything after the first colon of a "- [[" line.
+    return {
+        sys.intern(m.strip())
+        for sources_str in INDEX_SOURCES_PATTERN.findall(content)
+        for m in WIKILINK_PATTERN.findall(sources_str)
+    }
 
 def main():
-    filepath = sys.argv[1] if len(sys.argv) > 1 else '/Users/takagishota/Documents/KnowledgeBase/00_Concepts_Index.md'
+    refresh = '--refresh' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg not in ('--refresh', '--profile')]
+    filepath = args[0] if args else '/Users/takagishota/Documents/KnowledgeBase/00_Concepts_Index.md'
     
     print(f"Validating links in: {filepath}")
     
-    # 1. Get existing files from GCS
-    existing_files = get_gcs_files(BUCKET_NAME)
-    
-    if not existing_files:
-        print("No files found in GCS or access failed. Aborting.")
-        return
-
-    # 2. Get links from Index
+    # 1. Get links from Index
     linked_files = parse_concepts_index(filepath)
     print(f"Found {len(linked_files)} unique linked sources in Index.")
     
+    # 2. Get existing files: the recent local listing, direct lookups for a small index,
+    #    and the full GCS listing only for links those could not resolve
+    cache_path = os.path.join(LISTING_CACHE_DIR, f"{BUCKET_NAME}.txt")
+    existing_files = None if refresh else load_cached_files(cache_path, LISTING_CACHE_TTL_SECONDS)
+    if existing_files:
+        print(f"Using cached GCS listing ({len(existing_files)} files): {cache_path}")
+        unresolved = linked_files
+    else:
+        found = find_linked_files(BUCKET_NAME, linked_files)
+        if found is None:
+            unresolved = linked_files
+        else:
+            unresolved = linked_files - found
+            print(f"Resolved {len(found)} links by direct lookup.")
+        
+        if unresolved:
+            # Streamed: stops listing as soon as every unresolved link has been seen.
+            # Only a complete listing is cached.
+            remaining = set(unresolved)
+            listed = []
+            try:
+                for name in iter_gcs_files(BUCKET_NAME):
+                    listed.append(name)
+                    remaining.discard(name)
+                    if not remaining:
+                        break
+                else:
+                    print(f"Found {len(listed)} Markdown files in GCS.")
+                    if listed:
+                        save_cached_files(cache_path, listed)
+            except Exception as e:
+                print(f"Error accessing GCS: {e}")
+                listed = []
+            
+            existing_files = frozenset(listed)
+            if not existing_files:
+                print("No files found in GCS or access failed. Aborting.")
+                return
+    
     # 3. Validation
-    missing = []
-    for link in linked_files:
-        # Check against basic filename (case-sensitive? usually Obsidian is)
-        # Note: GCS filenames might have folders, but we indexed basenames.
-        # Wikilinks usually refer to the filename without path.
-        if link not in existing_files:
-            missing.append(link)
+    # Check against basic filename (case-sensitive? usually Obsidian is)
+    # Note: GCS filenames might have folders, but we indexed basenames.
+    # Wikilinks usually refer to the filename without path.
+    # (existing_files stays unset when direct lookups resolved every link)
+    missing = unresolved.difference(existing_files or ())
     
     print("\n=== Validation Results ===\n")
     if missing:
         print(f"Found {len(missing)} broken links (files not found in GCS):")
-        for m in sorted(missing):
+        for m in heapq.nsmallest(MAX_REPORTED_LINKS, missing):
             print(f"- [[{m}]]")
+        if len(missing) > MAX_REPORTED_LINKS:
+            print(f"... and {len(missing) - MAX_REPORTED_LINKS} more")
     else:
         print("✅ All links are valid! All referenced files exist in GCS.")
 
 if __name__ == "__main__":
-    main()
+    if '--profile' in sys.argv:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        main()
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+    else:
+        main()
@@ -1,56 +1,78 @@
 
 import os
 import sys
-import json
+import re
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-# Add cloud_function to sys.path
-sys.path.append(os.path.join(os.path.dirname(__file__), '../cloud_function'))
+# Repository root, resolved once (cloud_function/ and .env are found from here)
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Add cloud_function to the front of sys.path (services.* resolves on the first entry)
+sys.path.insert(0, str(REPO_ROOT / 'cloud_function'))
+
+# KEY=VALUE line of .env (blank lines, comments and lines without '=' are skipped;
+# the value is everything after the first '=')
+ENV_LINE_PATTERN = re.compile(r'^[^\S\n]*([^#=\s][^=\n]*)=(.*?)\s*$', re.MULTILINE)
 
 # Load .env manually
-env_path = os.path.join(os.path.dirname(__file__), '../.env')
-if os.path.exists(env_path):
+env_path = REPO_ROOT / '.env'
+if env_path.is_file():
     print(f"Loading .env from {env_path}")
-    with open(env_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                key, value = line.split('=', 1)
-                os.environ[key] = value
+    # Collected first, then set in one update (later duplicates win, as before)
+    os.environ.update(dict(ENV_LINE_PATTERN.findall(env_path.read_text())))
 
 # Setup logging to console
 logging.basicConfig(level=logging.DEBUG)
 
-# Import services
-try:
-    from services.pdf_processor import PdfProcessor
-    from services.gemini_service import GeminiService
-    from services.gcs_service import GcsService
-except ImportError as e:
-    print(f"Error importing services: {e}")
-    sys.exit(1)
+# PDFs given on the command line are processed concurrently (Gemini calls are I/O bound)
+TOC_WORKERS = 4
+
+def extract_toc(target_pdf, gemini, gcs, job_id):
+    """Runs TOC extraction for one PDF; returns (result, elapsed seconds)."""
+    from services.pdf_processor import PdfProcessor  # deferred like the imports in main()
+
+    # One processor per PDF: PdfProcessor keeps the currently opened document on the instance
+    processor = PdfProcessor()
+    start_time = time.time()
+    result = processor.extract_toc_with_ai(
+        pdf_path=target_pdf,
+        gemini_service=gemini,
+        gcs_service=gcs,
+        job_id=job_id
+    )
+    return result, time.time() - start_time
 
 def main():
     # Default target
     target_pdf = "/Users/takagishota/Developer/book-summary-system/test/野中郁次郎, 杉之尾孝生, 鎌田伸一, 寺本義也, 戸部良一, 村井友秀_失敗の本質 日本軍の組織論的研究.pdf"
     
-    # Allow override via arg
-    if len(sys.argv) > 1:
-        target_pdf = sys.argv[1]
+    # Allow override via args (one or more PDFs)
+    target_pdfs = sys.argv[1:] or [target_pdf]
 
-    if not os.path.exists(target_pdf):
-        print(f"Error: PDF not found at {target_pdf}")
+    for path in target_pdfs:
+        if not os.path.exists(path):
+            print(f"Error: PDF not found at {path}")
+    target_pdfs = [path for path in target_pdfs if os.path.exists(path)]
+    if not target_pdfs:
         return
 
+    # Import services (deferred until there is work to do: they pull in genai and GCS)
+    try:
+        from services.gemini_service import GeminiService
+        from services.json_utils import dumps_json
+    except ImportError as e:
+        print(f"Error importing services: {e}")
+        sys.exit(1)
+
     print("Initializing services...")
     try:
         gemini = GeminiService()
     except Exception as e:
         print(f"Failed to init GeminiService: {e}")
         return
-
-    processor = PdfProcessor()
     
     # Mock GCS Service
     class MockGcsUtils:
@@ -62,27 +84,30 @@ def main():
             print(f"[MockGCS] Uploading to blob")
         def download_as_text(self):
             return "{}"
+        def download_as_bytes(self):
+            return b"{}"
         def exists(self):
             return False
 
     mock_gcs = MockGcsUtils()
 
-    print(f"Processing {target_pdf}...")
+    print(f"Processing {len(target_pdfs)} PDF(s)...")
     
-    # Run TOC extraction
-    start_time = time.time()
-    result = processor.extract_toc_with_ai(
-        pdf_path=target_pdf,
-        gemini_service=gemini,
-        gcs_service=mock_gcs,
-        job_id="DEBUG_LOCAL_RUN"
-    )
-    elapsed = time.time() - start_time
+    # Run TOC extraction (one GeminiService shared by all PDFs)
+    with ThreadPoolExecutor(max_workers=min(TOC_WORKERS, len(target_pdfs))) as executor:
+        futures = [
+            executor.submit(extract_toc, path, gemini, mock_gcs,
+                            "DEBUG_LOCAL_RUN" if len(target_pdfs) == 1 else f"DEBUG_LOCAL_RUN_{i}")
+            for i, path in enumerate(target_pdfs)
+        ]
+        for path, future in zip(target_pdfs, futures):
+            result, elapsed = future.result()
 
-    print("\n" + "="*30)
-    print(f"RESULT (Time: {elapsed:.2f}s):")
-    print(json.dumps(result, indent=2, ensure_ascii=False))
-    print("="*30)
+            print("\n" + "="*30)
+            print(f"{os.path.basename(path)}")
+            print(f"RESULT (Time: {elapsed:.2f}s):")
+            print(dumps_json(result, indent=True).decode("utf-8"))
+            print("="*30)
 
 if __name__ == "__main__":
     main()